@@ -1,12 +1,20 @@
+import asyncio
+import hashlib
+import json
 import os
 from pathlib import Path
 import shutil
-from pdf_preprocessor import main as preprocess_pdf
-from transcript_writer import generate_transcript
+from pdf_preprocessor import process_pdf as preprocess_pdf
+from transcript_writer import (RateLimiter, agenerate_transcript,
+                               batch_generate_transcripts,
+                               generate_transcripts_batched, run_all)
 from podcast_generator import PodcastGenerator
 from search_generator import SearchQueryGenerator
-import time
-import random
+
+def iter_by_ext(directory, ext):
+    """List files with a given extension via one scandir pass (no per-entry stat)"""
+    with os.scandir(directory) as entries:
+        return [entry for entry in entries if entry.is_file() and entry.name.endswith(ext)]
 
 class PodcastWorkflow:
     def __init__(
@@ -15,7 +23,8 @@ class PodcastWorkflow:
         openai_api_key=None, 
         anthropic_api_key=None,
         elevenlabs_api_key=None,
-        llm_provider="openai"
+        llm_provider="openai",
+        force_regenerate=False
     ):
         # Define directory structure
         self.base_dir = Path(os.getcwd())
@@ -29,6 +38,18 @@ class PodcastWorkflow:
         
         # Create all necessary directories
         self._setup_directories()
+
+        # Device IDs per directory, cached so moves can pick the rename fast path
+        self._device_cache = {}
+
+        # Precomputed string forms of the hot directories so the per-file
+        # loops build plain f-strings instead of new Path objects
+        self._processed_pdfs_str = str(self.processed_pdfs_dir)
+        self._cleaned_text_str = str(self.cleaned_text_dir)
+        self._scripts_str = str(self.scripts_dir)
+        self._used_scripts_str = str(self.used_scripts_dir)
+        self._output_str = str(self.output_dir)
+        self._finished_text_str = str(self.finished_text_dir)
         
         # Initialize search generator with papers_per_query
         self.papers_per_query = papers_per_query
@@ -37,6 +58,13 @@ class PodcastWorkflow:
         # Track downloads for reporting
         self.failed_downloads = []
         self.successful_downloads = []
+
+        # Per-paper stage ledger persisted across runs; a crashed or
+        # interrupted pipeline resumes by skipping stages already recorded
+        # here (unless force_regenerate is set)
+        self.force_regenerate = force_regenerate
+        self.manifest_path = self.output_dir / "manifest.json"
+        self._manifest = self._load_manifest()
         
         self.openai_api_key = openai_api_key
         self.anthropic_api_key = anthropic_api_key
@@ -50,87 +78,204 @@ class PodcastWorkflow:
                          self.used_scripts_dir, self.output_dir,
                          self.finished_text_dir]:
             directory.mkdir(parents=True, exist_ok=True)
-    
-    def process_new_pdfs(self):
-        """Process all PDFs in the input directory"""
-        pdf_files = list(self.input_dir.glob("*.pdf"))
-        
-        if not pdf_files:
-            print("No PDF files found in input directory.")
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_manifest(self):
+        # Write-then-rename so a crash mid-dump can't corrupt the ledger
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def _file_hash(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _stage_done(self, paper_id, stage, input_path):
+        """True if this stage already ran against byte-identical input"""
+        if self.force_regenerate:
             return False
-        
-        processed_names = []
-        for pdf_path in pdf_files:
-            print(f"\nProcessing PDF: {pdf_path.name}")
-            
+        entry = self._manifest.get(paper_id, {}).get(stage)
+        if not entry:
+            return False
+        try:
+            return entry.get('input_hash') == self._file_hash(input_path)
+        except OSError:
+            return False
+
+    def _mark_done(self, paper_id, stage, input_path):
+        try:
+            input_hash = self._file_hash(input_path)
+        except OSError:
+            input_hash = None
+        self._manifest.setdefault(paper_id, {})[stage] = {
+            'done': True,
+            'input_hash': input_hash,
+        }
+        self._save_manifest()
+
+    def _dir_device(self, directory):
+        if directory not in self._device_cache:
+            self._device_cache[directory] = os.stat(directory).st_dev
+        return self._device_cache[directory]
+
+    def _move(self, src, dst):
+        """Move src to dst, via atomic os.replace when on the same filesystem"""
+        dst_dir = os.path.dirname(dst) or '.'
+        try:
+            if os.stat(src).st_dev == self._dir_device(dst_dir):
+                os.replace(src, dst)
+                return
+        except OSError:
+            pass
+        shutil.move(src, dst)
+
+    async def _process_one_pdf(self, pdf_entry, semaphore):
+        """Preprocess a single PDF and move its outputs into place"""
+        async with semaphore:
+            print(f"\nProcessing PDF: {pdf_entry.name}")
+
             # Step 1: Preprocess PDF and get descriptive name
-            descriptive_name = preprocess_pdf(str(pdf_path))
+            descriptive_name = await preprocess_pdf(pdf_entry.path)
             if not descriptive_name:
-                continue
-                
-            processed_names.append(descriptive_name)
-            
-            # Move processed PDF to processed directory with new name
-            new_pdf_name = f"{descriptive_name}.pdf"
-            shutil.move(str(pdf_path), 
-                       str(self.processed_pdfs_dir / new_pdf_name))
-            
+                return None
+
+            # Move files on a worker thread so other PDFs' API calls keep
+            # progressing while disk I/O happens
+            await asyncio.to_thread(self._move, pdf_entry.path,
+                                    f"{self._processed_pdfs_str}/{descriptive_name}.pdf")
+
             # Move cleaned text file to cleaned text directory
             cleaned_file = f"clean_{descriptive_name}.txt"
             if os.path.exists(cleaned_file):
-                shutil.move(cleaned_file, 
-                           str(self.cleaned_text_dir / cleaned_file))
-        
+                await asyncio.to_thread(self._move, cleaned_file,
+                                        f"{self._cleaned_text_str}/{cleaned_file}")
+
+            self._mark_done(descriptive_name, 'pdf',
+                            f"{self._processed_pdfs_str}/{descriptive_name}.pdf")
+            return descriptive_name
+
+    async def _process_new_pdfs(self, pdf_files, max_concurrent_pdfs=3):
+        semaphore = asyncio.Semaphore(max_concurrent_pdfs)
+        tasks = [self._process_one_pdf(pdf_entry, semaphore) for pdf_entry in pdf_files]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    def process_new_pdfs(self):
+        """Process all PDFs in the input directory"""
+        pdf_files = iter_by_ext(self.input_dir, ".pdf")
+
+        if not pdf_files:
+            print("No PDF files found in input directory.")
+            return False
+
+        results = asyncio.run(self._process_new_pdfs(pdf_files))
+
+        processed_names = []
+        for pdf_entry, result in zip(pdf_files, results):
+            if isinstance(result, Exception):
+                print(f"Error processing {pdf_entry.name}: {str(result)}")
+            elif result:
+                processed_names.append(result)
+
         return processed_names if processed_names else False
 
-    def generate_transcripts(self):
+    def generate_transcripts(self, use_batch=False, group=False, model=None):
         """Generate transcripts for all cleaned text files"""
-        cleaned_files = list(self.cleaned_text_dir.glob("*.txt"))
-        
+        cleaned_files = iter_by_ext(self.cleaned_text_dir, ".txt")
+
         if not cleaned_files:
             print("No cleaned text files found.")
             return False
-        
-        for cleaned_file in cleaned_files:
-            print(f"\nGenerating transcript for: {cleaned_file.name}")
+
+        # Each transcript is a long OpenAI call; driving them all on one
+        # event loop overlaps the network waits without a thread per paper
+        file_pairs = []
+        pair_names = []
+        for cleaned_entry in cleaned_files:
             # Extract descriptive name from cleaned file name
-            descriptive_name = cleaned_file.stem.replace('clean_', '')
-            output_file = self.scripts_dir / f"transcript_{descriptive_name}.txt"
-            
-            generate_transcript(str(cleaned_file), str(output_file))
-        
+            descriptive_name = cleaned_entry.name[:-len('.txt')].replace('clean_', '')
+            if self._stage_done(descriptive_name, 'transcript', cleaned_entry.path):
+                print(f"Skipping transcript for {descriptive_name} (already done)")
+                continue
+            print(f"\nGenerating transcript for: {cleaned_entry.name}")
+            output_file = f"{self._scripts_str}/transcript_{descriptive_name}.txt"
+            file_pairs.append((cleaned_entry.path, output_file))
+            pair_names.append((descriptive_name, cleaned_entry))
+
+        if not file_pairs:
+            return True
+
+        if use_batch or group:
+            if use_batch:
+                # Non-interactive runs trade latency for ~50% lower cost and
+                # no synchronous rate limits via the Batch API
+                written = set(batch_generate_transcripts(file_pairs))
+            else:
+                # Marshal several short papers into each request to amortize
+                # per-call overhead
+                written = set(generate_transcripts_batched(file_pairs))
+            for (descriptive_name, cleaned_entry), (_, output_file) in zip(pair_names, file_pairs):
+                if output_file in written:
+                    self._mark_done(descriptive_name, 'transcript', cleaned_entry.path)
+            return bool(written)
+
+        if model:
+            results = asyncio.run(run_all(file_pairs, model=model))
+        else:
+            results = asyncio.run(run_all(file_pairs))
+        for (descriptive_name, cleaned_entry), result in zip(pair_names, results):
+            if isinstance(result, Exception):
+                print(f"Error generating transcript for {cleaned_entry.name}: {str(result)}")
+            elif result:
+                self._mark_done(descriptive_name, 'transcript', cleaned_entry.path)
+
         return True
 
     def create_podcasts(self):
         """Generate podcasts from all transcript files"""
-        transcript_files = list(self.scripts_dir.glob("*.txt"))
-        
+        transcript_files = iter_by_ext(self.scripts_dir, ".txt")
+
         if not transcript_files:
             print("No transcript files found.")
             return False
-        
+
         generator = PodcastGenerator()
-        
-        for transcript_file in transcript_files:
+
+        for transcript_entry in transcript_files:
             # Extract descriptive name from transcript file name
-            descriptive_name = transcript_file.stem.replace('transcript_', '')
+            descriptive_name = transcript_entry.name[:-len('.txt')].replace('transcript_', '')
+            if self._stage_done(descriptive_name, 'audio', transcript_entry.path):
+                print(f"Skipping podcast for {descriptive_name} (already done)")
+                continue
             print(f"\nGenerating podcast for: {descriptive_name}")
-            output_file = self.output_dir / f"podcast_{descriptive_name}.mp3"
-            
+            output_file = f"{self._output_str}/podcast_{descriptive_name}.mp3"
+
             try:
-                generator.generate_podcast(str(transcript_file), str(output_file))
-                
+                generator.generate_podcast(transcript_entry.path, output_file)
+                # Record completion before the input moves out of scripts/
+                self._mark_done(descriptive_name, 'audio', transcript_entry.path)
+
                 # Move transcript to used_scripts
-                shutil.move(str(transcript_file), 
-                          str(self.used_scripts_dir / f"used_{descriptive_name}.txt"))
-                print(f"Moved used script to: {self.used_scripts_dir / f'used_{descriptive_name}.txt'}")
-                
+                used_script = f"{self._used_scripts_str}/used_{descriptive_name}.txt"
+                self._move(transcript_entry.path, used_script)
+                print(f"Moved used script to: {used_script}")
+
                 # Move cleaned text to finished folder
-                cleaned_text_file = self.cleaned_text_dir / f"clean_{descriptive_name}.txt"
-                if cleaned_text_file.exists():
-                    shutil.move(str(cleaned_text_file), 
-                              str(self.finished_text_dir / f"finished_{descriptive_name}.txt"))
-                    print(f"Moved cleaned text to: {self.finished_text_dir / f'finished_{descriptive_name}.txt'}")
+                cleaned_text_file = f"{self._cleaned_text_str}/clean_{descriptive_name}.txt"
+                if os.path.exists(cleaned_text_file):
+                    finished_file = f"{self._finished_text_str}/finished_{descriptive_name}.txt"
+                    self._move(cleaned_text_file, finished_file)
+                    print(f"Moved cleaned text to: {finished_file}")
             
             except Exception as e:
                 print(f"Error generating podcast for {descriptive_name}: {str(e)}")
@@ -138,63 +283,151 @@ class PodcastWorkflow:
         
         return True
 
+    async def _run_pipeline(self, pdf_files, on_status=None, model=None,
+                            pdf_workers=2, transcript_workers=4, tts_workers=2):
+        """
+        Run the three stages as a producer-consumer pipeline: while one
+        paper is in TTS, the next is mid-transcript and a third is still
+        being extracted, instead of every paper waiting at each stage
+        barrier. Worker counts reflect each stage's bottleneck — PDF
+        extraction is CPU-bound, transcripts are network-bound, TTS is
+        limited by provider concurrency.
+        """
+        transcript_queue = asyncio.Queue()
+        audio_queue = asyncio.Queue()
+        pdf_queue = asyncio.Queue()
+        for pdf_entry in pdf_files:
+            pdf_queue.put_nowait(pdf_entry)
+
+        generator = PodcastGenerator()
+        limiter = RateLimiter()
+        api_semaphore = asyncio.Semaphore(transcript_workers)
+        pdf_semaphore = asyncio.Semaphore(pdf_workers)
+        completed = []
+
+        def report(stage, name):
+            if on_status:
+                on_status(stage, name)
+
+        async def pdf_worker():
+            while True:
+                pdf_entry = await pdf_queue.get()
+                if pdf_entry is None:
+                    break
+                try:
+                    report('pdf', pdf_entry.name)
+                    descriptive_name = await self._process_one_pdf(pdf_entry, pdf_semaphore)
+                    if descriptive_name:
+                        await transcript_queue.put(descriptive_name)
+                except Exception as e:
+                    print(f"Error processing {pdf_entry.name}: {str(e)}")
+
+        async def transcript_worker():
+            while True:
+                descriptive_name = await transcript_queue.get()
+                if descriptive_name is None:
+                    break
+                cleaned_file = f"{self._cleaned_text_str}/clean_{descriptive_name}.txt"
+                output_file = f"{self._scripts_str}/transcript_{descriptive_name}.txt"
+                try:
+                    if self._stage_done(descriptive_name, 'transcript', cleaned_file):
+                        print(f"Skipping transcript for {descriptive_name} (already done)")
+                        await audio_queue.put(descriptive_name)
+                        continue
+                    report('transcript', descriptive_name)
+                    kwargs = {'model': model} if model else {}
+                    result = await agenerate_transcript(cleaned_file, output_file,
+                                                        api_semaphore, limiter, **kwargs)
+                    if result:
+                        self._mark_done(descriptive_name, 'transcript', cleaned_file)
+                        await audio_queue.put(descriptive_name)
+                except Exception as e:
+                    print(f"Error generating transcript for {descriptive_name}: {str(e)}")
+
+        async def tts_worker():
+            while True:
+                descriptive_name = await audio_queue.get()
+                if descriptive_name is None:
+                    break
+                transcript_file = f"{self._scripts_str}/transcript_{descriptive_name}.txt"
+                output_file = f"{self._output_str}/podcast_{descriptive_name}.mp3"
+                try:
+                    report('audio', descriptive_name)
+                    await asyncio.to_thread(generator.generate_podcast,
+                                            transcript_file, output_file)
+                    self._mark_done(descriptive_name, 'audio', transcript_file)
+
+                    await asyncio.to_thread(
+                        self._move, transcript_file,
+                        f"{self._used_scripts_str}/used_{descriptive_name}.txt")
+                    cleaned_text_file = f"{self._cleaned_text_str}/clean_{descriptive_name}.txt"
+                    if os.path.exists(cleaned_text_file):
+                        await asyncio.to_thread(
+                            self._move, cleaned_text_file,
+                            f"{self._finished_text_str}/finished_{descriptive_name}.txt")
+                    completed.append(descriptive_name)
+                except Exception as e:
+                    print(f"Error generating podcast for {descriptive_name}: {str(e)}")
+
+        pdf_pool = [asyncio.create_task(pdf_worker()) for _ in range(pdf_workers)]
+        transcript_pool = [asyncio.create_task(transcript_worker())
+                           for _ in range(transcript_workers)]
+        tts_pool = [asyncio.create_task(tts_worker()) for _ in range(tts_workers)]
+
+        # Drain stage by stage: a pool only gets its shutdown sentinels
+        # once everything upstream has finished feeding it
+        for _ in pdf_pool:
+            pdf_queue.put_nowait(None)
+        await asyncio.gather(*pdf_pool)
+        for _ in transcript_pool:
+            transcript_queue.put_nowait(None)
+        await asyncio.gather(*transcript_pool)
+        for _ in tts_pool:
+            audio_queue.put_nowait(None)
+        await asyncio.gather(*tts_pool)
+
+        return completed
+
+    def run_pipeline(self, on_status=None, model=None):
+        """Process every PDF in input/ end to end with overlapped stages"""
+        pdf_files = iter_by_ext(self.input_dir, ".pdf")
+
+        if not pdf_files:
+            print("No PDF files found in input directory.")
+            return []
+
+        return asyncio.run(self._run_pipeline(pdf_files, on_status=on_status, model=model))
+
     def cleanup_processed_files(self):
         """Optional: Clean up processed text files"""
         # Add any additional cleanup steps here if needed
         pass
 
     def generate_search_and_download(self, research_description):
-        """Generate search queries and download papers"""
-        print("\nGenerating search queries...")
-        queries = self.search_generator.generate_queries(research_description)
-        
-        if not queries:
-            print("Failed to generate valid search queries.")
+        """Generate search queries and download papers in one interleaved pass"""
+        print("\nGenerating search queries and downloading papers...")
+
+        try:
+            # Every streamed query line spawns its search-and-download task
+            # immediately, so the first downloads run while the LLM is
+            # still writing the remaining queries
+            downloaded = self.search_generator.generate_and_download(
+                research_description, total_limit=self.papers_per_query)
+        except Exception as e:
+            self.failed_downloads.append((research_description, str(e)))
+            print(f"\nFailed to download papers: {str(e)}")
             return False
-            
-        print("\nGenerated queries:")
-        for i, query in enumerate(queries, 1):
-            print(f"{i}. {query}")
-        
-        print(f"\nAttempting to download {self.papers_per_query} papers per query...")
-        papers_downloaded = 0  # Add counter for downloaded papers
-        
-        for query in queries:
-            # If we've already downloaded enough papers, break
-            if papers_downloaded >= self.papers_per_query:
-                break
-                
-            try:
-                result = self.search_generator.download_papers(
-                    [query], 
-                    limit_per_query=self.papers_per_query - papers_downloaded  # Adjust limit
-                )
-                
-                if result:
-                    self.successful_downloads.extend(result)
-                    papers_downloaded += len(result)
-                
-            except Exception as e:
-                self.failed_downloads.append((query, str(e)))
-                print(f"\nFailed to download papers for query: {query}")
-                print(f"Error: {str(e)}")
-            
-            # Add small delay between queries if we need more papers
-            if papers_downloaded < self.papers_per_query:
-                time.sleep(random.uniform(2, 5))
-        
+
+        self.successful_downloads.extend(downloaded)
+
         # Report results
         if self.successful_downloads:
             print(f"\nSuccessfully downloaded {len(self.successful_downloads)} papers:")
             for paper in self.successful_downloads:
                 print(f"- {paper}")
-        
-        if self.failed_downloads:
-            print(f"\nFailed to download papers for {len(self.failed_downloads)} queries:")
-            for query, error in self.failed_downloads:
-                print(f"- Query: {query}")
-                print(f"  Error: {error}")
-        
+        else:
+            print("\nNo papers were downloaded for the generated queries.")
+
         # Return True if we got any papers at all
         return bool(self.successful_downloads)
 
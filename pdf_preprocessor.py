@@ -1,9 +1,24 @@
 import PyPDF2
+import pymupdf
+import argparse
+import asyncio
+import hashlib
+import logging
 import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
-from anthropic import Anthropic
-from tqdm import tqdm
+import httpx
+import weakref
+from anthropic import AsyncAnthropic
 from dotenv import load_dotenv
+from rate_limiter import RateLimiter
+
+# Single buffered stream handler; per-page detail stays at DEBUG so the
+# parallel paths don't serialize on stdout
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+log = logging.getLogger(__name__)
 
 # Load environment variables from .env file
 load_dotenv()
@@ -13,8 +28,46 @@ api_key = os.getenv('ANTHROPIC_API_KEY')
 if not api_key:
     raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
 
-# Initialize Anthropic client with API key
-client = Anthropic(api_key=api_key)
+# One Anthropic client per event loop: within a loop every chunk/batch
+# call shares the pooled httpx client's warm TLS connections, but those
+# connections die with their loop — and each process_new_pdfs /
+# run_pipeline call starts a fresh loop via asyncio.run, so a module-wide
+# client would hand the second run a connection from a closed loop
+# ("RuntimeError: Event loop is closed"). WeakKeyDictionary entries are
+# dropped when their loop is garbage-collected.
+_CLIENTS = weakref.WeakKeyDictionary()
+
+def _get_client():
+    loop = asyncio.get_running_loop()
+    client = _CLIENTS.get(loop)
+    if client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+        )
+        client = AsyncAnthropic(api_key=api_key, http_client=http_client)
+        _CLIENTS[loop] = client
+    return client
+
+MODEL = "claude-3-haiku-20240307"
+
+# On-disk response cache: repeated chunks (re-runs, similar PDFs) become a
+# file read instead of an API call
+CACHE_DIR = ".llm_cache"
+
+def _cache_key(*parts: str) -> str:
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+def _cache_get(key: str) -> Optional[str]:
+    try:
+        with open(os.path.join(CACHE_DIR, key), 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _cache_set(key: str, text: str):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(os.path.join(CACHE_DIR, key), 'w', encoding='utf-8') as f:
+        f.write(text)
 
 SYS_PROMPT = """
 You are a world class text pre-processor. Please parse and return the raw PDF data in a way that is crispy and usable to send to a podcast writer.
@@ -33,152 +86,360 @@ Start your response directly with the processed text.
 
 def validate_pdf(file_path: str) -> bool:
     if not os.path.exists(file_path):
-        print(f"Error: File not found at path: {file_path}")
+        log.error("File not found at path: %s", file_path)
         return False
     if not file_path.lower().endswith('.pdf'):
-        print("Error: File is not a PDF")
+        log.error("File is not a PDF")
         return False
     return True
 
+# PDFs below this page count get one worker instead of a sharded range
+MIN_PAGES_FOR_PARALLEL = 20
+
+# One long-lived pool shared by every extraction: parsing is CPU-bound and
+# GIL-bound, so concurrent PDFs must run in processes, and reusing the pool
+# avoids paying the spawn cost per file. Workers receive only (path, start,
+# stop) and open their own document, so nothing unpicklable crosses over.
+_extract_pool = None
+# Callers arrive concurrently via asyncio.to_thread, so the lazy init
+# must be locked or racing threads each spawn (and leak) a full pool
+_extract_pool_lock = threading.Lock()
+
+def _get_extract_pool() -> ProcessPoolExecutor:
+    global _extract_pool
+    if _extract_pool is None:
+        with _extract_pool_lock:
+            if _extract_pool is None:
+                _extract_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _extract_pool
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> list:
+    """Worker: extract text for a slice of pages (runs in its own process)"""
+    with pymupdf.open(file_path) as doc:
+        return [doc[page_num].get_text() for page_num in range(start, stop)]
+
 def extract_text_from_pdf(file_path: str, max_chars: int = 100000) -> Optional[str]:
-    # ... existing extract_text_from_pdf function remains unchanged ...
     if not validate_pdf(file_path):
         return None
-    
+
+    try:
+        doc = pymupdf.open(file_path)
+    except Exception as e:
+        log.warning("PyMuPDF failed to open PDF (%s), falling back to PyPDF2", str(e))
+        return _extract_text_pypdf2(file_path, max_chars)
+
+    try:
+        with doc:
+            num_pages = len(doc)
+        log.info("Processing PDF with %d pages...", num_pages)
+
+        pool = _get_extract_pool()
+        if num_pages < MIN_PAGES_FOR_PARALLEL:
+            # A single worker still moves the parse off the GIL so other
+            # PDFs being processed concurrently get real parallelism
+            page_texts = pool.submit(_extract_page_range, file_path, 0, num_pages).result()
+        else:
+            # Shard page ranges across processes; reassemble in order
+            workers = min(os.cpu_count() or 1, num_pages)
+            step = -(-num_pages // workers)  # ceil division
+            ranges = [(start, min(start + step, num_pages))
+                      for start in range(0, num_pages, step)]
+
+            futures = [pool.submit(_extract_page_range, file_path, start, stop)
+                       for start, stop in ranges]
+            page_texts = []
+            for future in futures:
+                page_texts.extend(future.result())
+
+        extracted_text = []
+        total_chars = 0
+
+        for page_num, text in enumerate(page_texts):
+            if total_chars + len(text) > max_chars:
+                remaining_chars = max_chars - total_chars
+                extracted_text.append(text[:remaining_chars])
+                log.info("Reached %d character limit at page %d", max_chars, page_num + 1)
+                break
+
+            extracted_text.append(text)
+            total_chars += len(text)
+
+        final_text = '\n'.join(extracted_text)
+        log.info("Extraction complete! Total characters: %d", len(final_text))
+        return final_text
+
+    except Exception as e:
+        log.error("An unexpected error occurred: %s", str(e))
+        return None
+
+def _extract_text_pypdf2(file_path: str, max_chars: int = 100000) -> Optional[str]:
+    """Fallback extraction path for PDFs PyMuPDF can't open"""
     try:
         with open(file_path, 'rb') as file:
             pdf_reader = PyPDF2.PdfReader(file)
             num_pages = len(pdf_reader.pages)
-            print(f"Processing PDF with {num_pages} pages...")
-            
+            log.info("Processing PDF with %d pages...", num_pages)
+
             extracted_text = []
             total_chars = 0
-            
+
             for page_num in range(num_pages):
                 page = pdf_reader.pages[page_num]
                 text = page.extract_text()
-                
+
                 if total_chars + len(text) > max_chars:
                     remaining_chars = max_chars - total_chars
                     extracted_text.append(text[:remaining_chars])
-                    print(f"Reached {max_chars} character limit at page {page_num + 1}")
+                    log.info("Reached %d character limit at page %d", max_chars, page_num + 1)
                     break
-                
+
                 extracted_text.append(text)
                 total_chars += len(text)
-                print(f"Processed page {page_num + 1}/{num_pages}")
-            
+                log.debug("Processed page %d/%d", page_num + 1, num_pages)
+
             final_text = '\n'.join(extracted_text)
-            print(f"\nExtraction complete! Total characters: {len(final_text)}")
+            log.info("Extraction complete! Total characters: %d", len(final_text))
             return final_text
-            
+
     except Exception as e:
-        print(f"An unexpected error occurred: {str(e)}")
+        log.error("An unexpected error occurred: %s", str(e))
         return None
 
-def create_word_bounded_chunks(text: str, target_chunk_size: int) -> list:
+def create_token_bounded_chunks(text: str, target_tokens: int = 4000) -> list:
+    """Pack words greedily into chunks of roughly target_tokens tokens.
+
+    Uses the ~4 chars/token approximation; claude-3-haiku accepts far more,
+    so this errs well on the safe side while keeping request counts low.
+    """
     words = text.split()
     chunks = []
     current_chunk = []
-    current_length = 0
-    
+    current_tokens = 0
+
     for word in words:
-        word_length = len(word) + 1  # +1 for the space
-        if current_length + word_length > target_chunk_size and current_chunk:
+        word_tokens = len(word) // 4 + 1
+        if current_tokens + word_tokens > target_tokens and current_chunk:
             chunks.append(' '.join(current_chunk))
             current_chunk = [word]
-            current_length = word_length
+            current_tokens = word_tokens
         else:
             current_chunk.append(word)
-            current_length += word_length
-    
+            current_tokens += word_tokens
+
     if current_chunk:
         chunks.append(' '.join(current_chunk))
-    
+
     return chunks
 
-def process_chunk(text_chunk: str, chunk_num: int) -> str:
-    """Process a chunk of text using Anthropic's Claude API"""
-    try:
-        response = client.messages.create(
-            model="claude-3-haiku-20240307",  # or other Claude models
-            max_tokens=1000,
-            temperature=0.7,
-            system=SYS_PROMPT,
-            messages=[
-                {"role": "user", "content": text_chunk}
-            ]
-        )
-        
-        processed_text = response.content[0].text.strip()
-        
-        # Print chunk information for monitoring
-        print(f"\nProcessing chunk {chunk_num}:")
-        print(f"INPUT TEXT:\n{text_chunk[:200]}...")
-        print(f"\nPROCESSED TEXT:\n{processed_text[:200]}...")
-        print("=" * 80)
-        
-        return processed_text
-    
-    except Exception as e:
-        print(f"Error processing chunk {chunk_num}: {str(e)}")
-        return text_chunk  # Return original chunk if processing fails
+# How much chunk text to pack into a single API request (~5k tokens)
+MAX_BATCH_CHARS = 20000
+
+_CHUNK_DELIM_RE = re.compile(r'<<<CHUNK (\d+)>>>')
+
+BATCH_INSTRUCTION = """
+The input contains multiple chunks, each preceded by a <<<CHUNK n>>> marker.
+Clean each chunk independently and reproduce the exact same <<<CHUNK n>>> marker
+before each cleaned chunk in your response.
+"""
+
+FILENAME_INSTRUCTION = """
+Additionally, before the first chunk marker, output exactly one line:
+FILENAME: <short descriptive filename>
+Use only lowercase letters, numbers, and underscores, maximum 20 characters,
+1 or 2 words capturing the paper's main topic.
+"""
+
+def _sanitize_filename(raw: str) -> str:
+    return ''.join(c for c in raw.strip().lower() if c.isalnum() or c == '_')
+
+def _batch_chunks(chunks: list, max_batch_chars: int = MAX_BATCH_CHARS) -> list:
+    """Group consecutive chunks into batches under a combined size budget"""
+    batches = []
+    current = []
+    current_length = 0
+
+    for chunk in chunks:
+        if current and current_length + len(chunk) > max_batch_chars:
+            batches.append(current)
+            current = []
+            current_length = 0
+        current.append(chunk)
+        current_length += len(chunk)
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+async def process_batch(chunk_batch: list, batch_num: int, semaphore: asyncio.Semaphore,
+                        limiter: RateLimiter, use_cache: bool = True,
+                        want_filename: bool = False) -> tuple:
+    """Clean a batch of chunks in one Claude request, returning them in order.
+
+    Returns (cleaned_chunks, filename); filename is only populated when
+    want_filename is set (the first batch piggybacks the naming request so
+    no separate LLM call is needed).
+    """
+    batch_text = "\n".join(f"<<<CHUNK {i}>>>\n{chunk}" for i, chunk in enumerate(chunk_batch))
+
+    cache_key = _cache_key(MODEL, SYS_PROMPT, "named" if want_filename else "", batch_text)
+    if use_cache:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            parts = cached.split("\x00")
+            if want_filename:
+                return parts[1:], parts[0] or None
+            return parts, None
 
-def generate_descriptive_name(text: str) -> str:
-    """Generate a descriptive filename using Claude"""
     try:
-        response = client.messages.create(
-            model="claude-3-haiku-20240307",
-            max_tokens=50,
-            temperature=0.7,
-            system="Generate a short, descriptive filename (without extension) for an academic paper. Use only lowercase letters, numbers, and underscores. Maximum 20 characters, 1 or 2 words. The filename should capture the main topic and key focus.",
-            messages=[
-                {"role": "user", "content": f"Generate a filename for this paper:\n\n{text[:2000]}"}
-            ]
-        )
-        
-        filename = response.content[0].text.strip().lower()
-        # Clean filename of any invalid characters
-        filename = ''.join(c for c in filename if c.isalnum() or c == '_')
-        return filename
-    
+        async with semaphore:
+            # Rough token estimate: input plus response budget
+            await limiter.acquire(len(batch_text) // 2)
+            response = await _get_client().messages.create(
+                model=MODEL,  # or other Claude models
+                max_tokens=4096,
+                temperature=0.7,
+                # Mark the stable system prompt for server-side prompt caching:
+                # every batch reuses the cached prefix instead of re-billing it.
+                # The batching instruction rides in a second, uncached block so
+                # the cached prefix stays byte-identical.
+                system=[
+                    {
+                        "type": "text",
+                        "text": SYS_PROMPT,
+                        "cache_control": {"type": "ephemeral"}
+                    },
+                    {"type": "text", "text": BATCH_INSTRUCTION + (FILENAME_INSTRUCTION if want_filename else "")}
+                ],
+                extra_headers={"anthropic-beta": "prompt-caching-2024-07-31"},
+                messages=[
+                    {"role": "user", "content": batch_text}
+                ]
+            )
+
+        response_text = response.content[0].text
+        truncated = response.stop_reason == "max_tokens"
+
+        # Recover the per-chunk outputs from the delimited response
+        pieces = _CHUNK_DELIM_RE.split(response_text)
+        cleaned = list(chunk_batch)  # fall back to originals for missing markers
+        indices = [int(index_str) for index_str in pieces[1::2]]
+        for index, piece in zip(indices, pieces[2::2]):
+            if index < len(cleaned):
+                cleaned[index] = piece.strip()
+
+        # A completion cut at the max_tokens cap ends mid-chunk: keep the
+        # original text for the piece that was severed rather than passing
+        # a silent fragment downstream
+        if truncated and indices:
+            cut_index = indices[-1]
+            if cut_index < len(cleaned):
+                log.warning("Batch %d hit the max_tokens cap; keeping original text for chunk %d",
+                            batch_num, cut_index)
+                cleaned[cut_index] = chunk_batch[cut_index]
+
+        # The filename rides in the preamble before the first chunk marker
+        filename = None
+        if want_filename:
+            for line in pieces[0].splitlines():
+                if line.strip().startswith("FILENAME:"):
+                    filename = _sanitize_filename(line.split(":", 1)[1])
+                    break
+
+        log.debug("Processed batch %d (%d chunks)", batch_num, len(chunk_batch))
+
+        # Never cache a truncated batch: the fallback text is correct but
+        # re-runs should get another shot at a full cleaning pass
+        if use_cache and not truncated:
+            if want_filename:
+                _cache_set(cache_key, "\x00".join([filename or ""] + cleaned))
+            else:
+                _cache_set(cache_key, "\x00".join(cleaned))
+
+        return cleaned, filename
+
     except Exception as e:
-        print(f"Error generating filename: {str(e)}")
-        return None
+        log.error("Error processing batch %d: %s", batch_num, str(e))
+        return list(chunk_batch), None  # Return original chunks if processing fails
+
+async def process_chunks(chunks: list, max_concurrency: int = 8,
+                         max_requests_per_minute: int = 50,
+                         max_tokens_per_minute: int = 80000,
+                         use_cache: bool = True) -> tuple:
+    """Process all chunks concurrently, preserving chunk order in the result.
+
+    Returns (cleaned_chunks, filename); the filename comes from the first
+    batch's consolidated naming request.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limiter = RateLimiter(max_requests_per_minute, max_tokens_per_minute)
+    batches = _batch_chunks(chunks)
+    tasks = [process_batch(batch, i, semaphore, limiter, use_cache=use_cache,
+                           want_filename=(i == 0))
+             for i, batch in enumerate(batches)]
+    results = await asyncio.gather(*tasks)
+    cleaned = [chunk for batch, _ in results for chunk in batch]
+    filename = results[0][1] if results else None
+    return cleaned, filename
 
-def main(pdf_path: str, chunk_size: int = 1000):
-    # Extract text from PDF
-    extracted_text = extract_text_from_pdf(pdf_path)
+def _write_text(path: str, text: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+async def process_pdf(pdf_path: str, target_tokens: int = 4000, max_concurrency: int = 8,
+                      max_requests_per_minute: int = 50, max_tokens_per_minute: int = 80000,
+                      use_cache: bool = True):
+    """Preprocess a single PDF: extract, clean chunks, write output"""
+    # Extraction is blocking (CPU + disk), keep it off the event loop
+    extracted_text = await asyncio.to_thread(extract_text_from_pdf, pdf_path)
     if not extracted_text:
         return None
-    
-    # Generate descriptive name
-    descriptive_name = generate_descriptive_name(extracted_text)
+
+    # Process chunks concurrently; the first batch also returns the
+    # descriptive filename, saving a dedicated naming call
+    chunks = create_token_bounded_chunks(extracted_text, target_tokens)
+
+    log.info("Processing %d chunks...", len(chunks))
+
+    processed_chunks, descriptive_name = await process_chunks(
+        chunks,
+        max_concurrency=max_concurrency,
+        max_requests_per_minute=max_requests_per_minute,
+        max_tokens_per_minute=max_tokens_per_minute,
+        use_cache=use_cache
+    )
+
     if not descriptive_name:
         descriptive_name = os.path.splitext(os.path.basename(pdf_path))[0]
-    
+
     # Create output filename with descriptive name
     output_dir = "cleanedText"
     os.makedirs(output_dir, exist_ok=True)
     output_file = os.path.join(output_dir, f"clean_{descriptive_name}.txt")
-    
-    # Process chunks as before
-    chunks = create_word_bounded_chunks(extracted_text, chunk_size)
-    processed_text = ""
-    
-    print(f"\nProcessing {len(chunks)} chunks...")
-    
-    with open(output_file, 'w', encoding='utf-8') as out_file:
-        for chunk_num, chunk in enumerate(tqdm(chunks)):
-            processed_chunk = process_chunk(chunk, chunk_num)
-            processed_text += processed_chunk + "\n"
-            out_file.write(processed_chunk + "\n")
-            out_file.flush()
-    
-    print(f"\nProcessing complete!")
-    print(f"Output saved to: {output_file}")
-    
+
+    # Single buffered write, off the event loop so concurrent PDFs'
+    # API calls keep progressing during disk I/O
+    await asyncio.to_thread(_write_text, output_file, "\n".join(processed_chunks) + "\n")
+
+    log.info("Processing complete!")
+    log.info("Output saved to: %s", output_file)
+
     return descriptive_name
 
+def main(pdf_path: str, target_tokens: int = 4000, max_concurrency: int = 8,
+         max_requests_per_minute: int = 50, max_tokens_per_minute: int = 80000,
+         use_cache: bool = True):
+    return asyncio.run(process_pdf(
+        pdf_path, target_tokens,
+        max_concurrency=max_concurrency,
+        max_requests_per_minute=max_requests_per_minute,
+        max_tokens_per_minute=max_tokens_per_minute,
+        use_cache=use_cache
+    ))
+
 if __name__ == "__main__":
-    main(pdf_path)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Preprocess a PDF into cleaned podcast-ready text')
+    parser.add_argument('pdf_path', help='path to the PDF to process')
+    parser.add_argument('--no-cache', action='store_true', help='bypass the on-disk LLM response cache')
+    args = parser.parse_args()
+    main(args.pdf_path, use_cache=not args.no_cache)
\ No newline at end of file
@@ -1,24 +1,39 @@
+import hashlib
+import httpx
+import io
+import mmap
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from elevenlabs import VoiceSettings
 from elevenlabs.client import ElevenLabs
-from pydub import AudioSegment
 from dotenv import load_dotenv
 import ast
+import orjson
 from tqdm import tqdm
 
 class PodcastGenerator:
+    # On-disk MP3 cache so identical segments skip synthesis entirely
+    CACHE_DIR = "tts_cache"
+    CACHE_MAX_ENTRIES = 512
+    MODEL_ID = "eleven_turbo_v2_5"
+
     def __init__(self):
         # Load environment variables
         load_dotenv()
+        # Pooled sync client (TTS calls run on threads); keep-alive
+        # connections are shared across all segment requests
         self.client = ElevenLabs(
-            api_key=os.getenv('ELEVENLABS_API_KEY')
+            api_key=os.getenv('ELEVENLABS_API_KEY'),
+            httpx_client=httpx.Client(
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+            )
         )
-        
+
         # Define voice IDs for speakers
         self.SPEAKER1_VOICE_ID = "pFZP5JQG7iQjIQuC4Bku"
         self.SPEAKER2_VOICE_ID = "flq6f7yk4E4fJM5XTYuZ"
-        
+
         # Define voice settings
         self.voice_settings = VoiceSettings(
             stability=0.5,
@@ -26,55 +41,97 @@ class PodcastGenerator:
             style=0.0,
             use_speaker_boost=True
         )
-        
+
+    def _cache_path(self, text, voice_id):
+        key = hashlib.sha256(
+            f"{voice_id}|{self.MODEL_ID}|{self.voice_settings.stability}|"
+            f"{self.voice_settings.similarity_boost}|{self.voice_settings.style}|{text}".encode()
+        ).hexdigest()
+        return os.path.join(self.CACHE_DIR, f"{key}.mp3")
+
+    def _prune_cache(self):
+        """Keep the cache bounded; evict oldest entries by mtime"""
+        try:
+            with os.scandir(self.CACHE_DIR) as entries:
+                files = [(entry.stat().st_mtime, entry.path) for entry in entries if entry.is_file()]
+            for _, path in sorted(files)[:max(0, len(files) - self.CACHE_MAX_ENTRIES)]:
+                os.remove(path)
+        except OSError:
+            pass
+
     def generate_speaker_audio(self, text, voice_id):
         """Generate audio using ElevenLabs API"""
+        cache_path = self._cache_path(text, voice_id)
+        try:
+            with open(cache_path, 'rb') as cached:
+                return cached.read()
+        except OSError:
+            pass
+
         response = self.client.text_to_speech.convert(
             voice_id=voice_id,
             output_format="mp3_44100_128",
             text=text,
-            model_id="eleven_turbo_v2_5",
+            model_id=self.MODEL_ID,
             voice_settings=self.voice_settings
         )
-        
-        # Save temporary file and load as AudioSegment
-        temp_path = f"temp_{voice_id}.mp3"
-        with open(temp_path, "wb") as f:
-            for chunk in response:
-                if chunk:
-                    f.write(chunk)
-                    
-        audio_segment = AudioSegment.from_mp3(temp_path)
-        os.remove(temp_path)
-        
-        return audio_segment
+
+        # Collect the encoded MP3 stream directly; no temp file, no decode
+        buf = io.BytesIO()
+        for chunk in response:
+            if chunk:
+                buf.write(chunk)
+
+        audio = buf.getvalue()
+
+        os.makedirs(self.CACHE_DIR, exist_ok=True)
+        with open(cache_path, 'wb') as cached:
+            cached.write(audio)
+        self._prune_cache()
+
+        return audio
 
     def generate_podcast(self, script_path, output_path):
         """Generate full podcast from script file"""
-        # Read script file
-        with open(script_path, 'r') as file:
-            script_content = file.read()
-        
-        # Parse JSON script
-        dialogue_data = ast.literal_eval(script_content)
+        # Memory-map the script so the parser reads pages on demand instead
+        # of copying the whole file into a Python string first.
+        # Parse JSON; fall back to ast for legacy Python-dict scripts.
+        with open(script_path, 'rb') as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            try:
+                dialogue_data = orjson.loads(memoryview(mm))
+            except orjson.JSONDecodeError:
+                dialogue_data = ast.literal_eval(mm[:].decode('utf-8'))
         conversation = dialogue_data['conversation']
         
-        # Initialize final audio
-        final_audio = None
-        
-        # Generate audio for each segment
-        for segment in tqdm(conversation, desc="Generating podcast segments"):
-            voice_id = self.SPEAKER1_VOICE_ID if segment['speaker'] == "Speaker 1" else self.SPEAKER2_VOICE_ID
-            audio_segment = self.generate_speaker_audio(segment['dialogue'], voice_id)
-            
-            # Add to final audio
-            if final_audio is None:
-                final_audio = audio_segment
-            else:
-                final_audio += audio_segment
-        
-        # Export final podcast
-        final_audio.export(output_path, format="mp3", bitrate="192k")
+        # Build (text, voice) jobs so segments keep their order
+        jobs = [
+            (segment['dialogue'],
+             self.SPEAKER1_VOICE_ID if segment['speaker'] == "Speaker 1" else self.SPEAKER2_VOICE_ID)
+            for segment in conversation
+        ]
+
+        # Generate segment audio concurrently and stream each segment to the
+        # output file as soon as it's next in order, so network and disk I/O
+        # overlap and we never hold the whole podcast in memory. All segments
+        # are CBR MP3 with identical parameters (fixed mp3_44100_128 output),
+        # so the encoded streams concatenate directly.
+        with ThreadPoolExecutor(max_workers=8) as executor, \
+                open(output_path, 'wb') as out_file, \
+                tqdm(total=len(jobs), desc="Generating podcast segments") as progress:
+            futures = {
+                executor.submit(self.generate_speaker_audio, text, voice_id): index
+                for index, (text, voice_id) in enumerate(jobs)
+            }
+            pending = {}
+            next_index = 0
+            for future in as_completed(futures):
+                pending[futures[future]] = future.result()
+                progress.update(1)
+                while next_index in pending:
+                    out_file.write(pending.pop(next_index))
+                    next_index += 1
+
         print(f"Podcast saved to: {output_path}")
 
 def main():
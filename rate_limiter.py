@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+class RateLimiter:
+    """Throttle parallel API calls to a requests/minute and tokens/minute budget"""
+    def __init__(self, max_requests_per_minute: int = 50, max_tokens_per_minute: int = 80000):
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self.available_requests = float(max_requests_per_minute)
+        self.available_tokens = float(max_tokens_per_minute)
+        self.last_update = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, estimated_tokens: int):
+        # An estimate above the whole per-minute budget could never be
+        # satisfied and would spin here forever; clamp it so the caller
+        # waits for a full replenished window and dispatches anyway
+        estimated_tokens = min(estimated_tokens, self.max_tokens_per_minute)
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                elapsed = now - self.last_update
+                self.last_update = now
+                self.available_requests = min(
+                    self.max_requests_per_minute,
+                    self.available_requests + elapsed * self.max_requests_per_minute / 60
+                )
+                self.available_tokens = min(
+                    self.max_tokens_per_minute,
+                    self.available_tokens + elapsed * self.max_tokens_per_minute / 60
+                )
+                if self.available_requests >= 1 and self.available_tokens >= estimated_tokens:
+                    self.available_requests -= 1
+                    self.available_tokens -= estimated_tokens
+                    return
+            await asyncio.sleep(1)
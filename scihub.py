@@ -9,15 +9,26 @@ Sci-API Unofficial API
 
 import re
 import argparse
+import asyncio
 import hashlib
+import json
 import logging
 import os
 import random
+import shutil
+import socket
+import tempfile
+import threading
 import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+import lxml.etree
+import lxml.html
 import requests
 import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 from retrying import retry
 from fake_useragent import UserAgent
@@ -32,13 +43,129 @@ urllib3.disable_warnings()
 
 # constants
 SCHOLARS_BASE_URL = 'https://scholar.google.com/scholar'
-USER_AGENT = UserAgent()
+_DEFAULT_MIRRORS = ('https://sci-hub.se', 'https://sci-hub.st', 'https://sci-hub.ru')
+_MIRROR_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'scihub', 'mirrors.json')
+_MIRROR_CACHE_TTL = 24 * 60 * 60  # seconds
+
+# UserAgent() may hit the network or fail outright in offline
+# environments; never let it block or break import
+try:
+    USER_AGENT = UserAgent()
+except Exception:
+    USER_AGENT = None
+
+_STATIC_UAS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.6 Safari/605.1.15',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:133.0) Gecko/20100101 Firefox/133.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:133.0) Gecko/20100101 Firefox/133.0',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:133.0) Gecko/20100101 Firefox/133.0',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36 Edg/131.0.0.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36 OPR/115.0.0.0',
+)
 BASE_HEADERS = {
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
     'Accept-Language': 'en-US,en;q=0.5',
     'Connection': 'keep-alive',
 }
 
+
+def _build_ua_pool():
+    """
+    Snapshot a pool of user-agent strings once at import. Per-request picks
+    become a random.choice instead of fake_useragent's disk/JSON lookup.
+    """
+    if USER_AGENT is None:
+        return _STATIC_UAS
+    try:
+        pool = {entry['useragent'] for entry in USER_AGENT.data_browsers
+                if entry.get('browser') in ('Chrome', 'Firefox')}
+    except (AttributeError, KeyError, TypeError):
+        pool = set()
+    if not pool:
+        try:
+            pool = {USER_AGENT.random for _ in range(20)}
+        except Exception:
+            return _STATIC_UAS
+    return tuple(pool)
+
+
+_UA_POOL = _build_ua_pool()
+# Pre-built header dicts: zero per-call allocation in _get_random_headers
+_UA_HEADER_TEMPLATES = tuple({**BASE_HEADERS, 'User-Agent': ua} for ua in _UA_POOL)
+
+# Compiled once; each lookup is a single C-level search per pattern
+_PDF_PATTERNS = [re.compile(p) for p in (
+    r'iframe src="(.*?)"',
+    r"location.href='(.*?)'",
+    r'pdf_url\s*=\s*[\'"]([^\'"]+)[\'"]',
+    r'<embed src="(.*?)"')]
+_NAME_STRIP = re.compile(r'#view=.+')
+_CLASSIFY_RE = re.compile(
+    r'^(?:(?P<direct>https?://\S+pdf)$|(?P<url>https?://)|(?P<pmid>\d+$)|(?P<doi>10\.))')
+
+# Precompiled XPath: each Scholar result is extracted in one C call
+# instead of a chain of Python-level .find traversals
+def _class_predicate(name):
+    # Token-safe class test: bare contains() would also match e.g. the
+    # inner gs_ri div when looking for gs_r, yielding duplicate results
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+_RESULT_XP = lxml.etree.XPath(f"//div[{_class_predicate('gs_r')} and not(.//table)]")
+_PDF_XP = lxml.etree.XPath(f".//div[{_class_predicate('gs_ggs')}]//a/@href")
+_LINK_XP = lxml.etree.XPath(f".//h3[{_class_predicate('gs_rt')}]//a/@href")
+_TITLE_XP = lxml.etree.XPath(f"string(.//h3[{_class_predicate('gs_rt')}])")
+
+class TokenBucket(object):
+    """
+    Per-host token bucket: requests consume a token, the bucket refills at
+    refill_rate tokens/sec up to capacity. Bursts proceed immediately while
+    sustained traffic is smoothed to what the host tolerates.
+    """
+
+    def __init__(self, capacity, refill_rate):
+        self.capacity = capacity
+        self.tokens = capacity
+        self.refill_rate = refill_rate
+        self._base_rate = refill_rate
+        self._penalty_until = 0.0
+        self.last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n=1):
+        """
+        Consume n tokens and return the number of seconds the caller should
+        sleep before issuing its request (0 when tokens are available).
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._penalty_until and now >= self._penalty_until:
+                self.refill_rate = self._base_rate
+                self._penalty_until = 0.0
+            self.tokens = min(self.capacity,
+                              self.tokens + (now - self.last_refill) * self.refill_rate)
+            self.last_refill = now
+            if self.tokens >= n:
+                self.tokens -= n
+                return 0.0
+            wait = (n - self.tokens) / self.refill_rate
+            self.tokens -= n
+            return wait
+
+    def penalize(self, duration=60.0):
+        """Halve the refill rate for duration seconds (adaptive 429 throttle)"""
+        with self._lock:
+            # Drop accrued burst tokens too: after a 429 the very next
+            # acquire must wait for a refill instead of re-hitting the host
+            self.tokens = 0.0
+            self.last_refill = time.monotonic()
+            self.refill_rate = self._base_rate / 2
+            self._penalty_until = self.last_refill + duration
+
+
 class SciHub(object):
     """
     SciHub class can search for papers on Google Scholars 
@@ -47,9 +174,25 @@ class SciHub(object):
 
     def __init__(self):
         self.sess = requests.Session()
-        self.sess.headers = self._get_random_headers()
+        # Static headers go on the session once; only User-Agent rotates
+        self.sess.headers.update(BASE_HEADERS)
+        self.sess.headers['User-Agent'] = random.choice(_UA_POOL)
+        # Pooled adapter with transport-level retries so mirror fetches reuse
+        # warm keep-alive connections instead of re-handshaking TLS
+        adapter = HTTPAdapter(
+            pool_connections=32, pool_maxsize=64, pool_block=False,
+            max_retries=Retry(total=5, connect=3, read=3, status=3,
+                              backoff_factor=0.3,
+                              status_forcelist=(500, 502, 503, 504),
+                              allowed_methods=frozenset(['GET', 'HEAD'])))
+        self.sess.mount('https://', adapter)
+        self.sess.mount('http://', adapter)
         self.available_base_url_list = self._get_available_scihub_urls()
         self.base_url = self.available_base_url_list[0] + '/'
+        # urlparse is regex + namedtuple per call; the base url only changes
+        # in _change_base_url, so cache its netloc once
+        self._base_netloc = urllib.parse.urlparse(self.base_url).netloc
+        self._base_scheme_host = 'https://' + self._base_netloc
         self.proxy_list = [
             'socks5h://127.0.0.1:9050',  # Tor proxy if available
             # Add your proxies here
@@ -58,23 +201,66 @@ class SciHub(object):
         self.max_retries = 3
         self.retry_delay = 30
         self.captcha_wait = 60  # seconds to wait when CAPTCHA is encountered
+        self.buckets = {}  # per-host TokenBucket, keyed by netloc
+
+    def _bucket_for(self, url):
+        host = urllib.parse.urlparse(url).netloc
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            # Scholar tolerates a faster sustained rate than the mirrors
+            if 'scholar.google' in host:
+                bucket = TokenBucket(capacity=5, refill_rate=0.5)
+            else:
+                bucket = TokenBucket(capacity=3, refill_rate=0.2)
+            self.buckets[host] = bucket
+        return bucket
+
+    def _throttle(self, url):
+        """Block until the host's token bucket admits another request"""
+        wait = self._bucket_for(url).acquire()
+        if wait > 0:
+            time.sleep(wait)
 
     def _get_random_headers(self):
-        """Generate random headers for each request"""
-        headers = BASE_HEADERS.copy()
-        headers['User-Agent'] = USER_AGENT.random
-        return headers
+        """Pick a prebuilt random-UA header set for the request"""
+        return random.choice(_UA_HEADER_TEMPLATES)
 
     def _get_available_scihub_urls(self):
         '''
-        Finds available scihub urls via https://sci-hub.now.sh/
+        Finds available scihub urls via https://sci-hub.now.sh/, cached on
+        disk with a 24h TTL so startup is one os.stat instead of an HTTPS
+        round-trip plus HTML parse.
         '''
+        try:
+            if time.time() - os.path.getmtime(_MIRROR_CACHE) < _MIRROR_CACHE_TTL:
+                with open(_MIRROR_CACHE) as f:
+                    urls = json.load(f)
+                if urls:
+                    return urls
+        except (OSError, ValueError):
+            pass
+
         urls = []
-        res = requests.get('https://sci-hub.now.sh/')
-        s = self._get_soup(res.content)
-        for a in s.find_all('a', href=True):
-            if 'sci-hub.' in a['href']:
-                urls.append(a['href'])
+        try:
+            # Use the pooled session so the connection is reused by later requests
+            res = self.sess.get('https://sci-hub.now.sh/', timeout=15)
+            s = self._get_soup(res.content)
+            for a in s.find_all('a', href=True):
+                if 'sci-hub.' in a['href']:
+                    urls.append(a['href'])
+        except requests.exceptions.RequestException:
+            logger.info('Mirror discovery failed, using default mirror list')
+            return list(_DEFAULT_MIRRORS)
+
+        if not urls:
+            return list(_DEFAULT_MIRRORS)
+
+        try:
+            os.makedirs(os.path.dirname(_MIRROR_CACHE), exist_ok=True)
+            with open(_MIRROR_CACHE, 'w') as f:
+                json.dump(urls, f)
+        except OSError:
+            pass
         return urls
 
     def set_proxy(self, proxy):
@@ -93,6 +279,8 @@ class SciHub(object):
             raise Exception('Ran out of valid sci-hub urls')
         del self.available_base_url_list[0]
         self.base_url = self.available_base_url_list[0] + '/'
+        self._base_netloc = urllib.parse.urlparse(self.base_url).netloc
+        self._base_scheme_host = 'https://' + self._base_netloc
         logger.info("I'm changing to {}".format(self.available_base_url_list[0]))
 
     def search(self, query, limit=10, download=False):
@@ -100,21 +288,23 @@ class SciHub(object):
         Performs a query on scholar.google.com, and returns a dictionary
         of results in the form {'papers': ...}
         """
-        print(f"Searching Google Scholar for: {query}")
+        logger.debug("Searching Google Scholar for: %s", query)
         start = 0
         results = {'papers': []}
 
         while True:
             try:
-                # Add random delay between requests
-                time.sleep(random.uniform(2, 5))
-                
-                # Update headers for each request
-                self.sess.headers = self._get_random_headers()
-                
-                search_url = f"{SCHOLARS_BASE_URL}?q={query}&start={start}"
-                print(f"Requesting URL: {search_url}")
-                
+                # Token bucket admits bursts but smooths sustained rate
+                self._throttle(SCHOLARS_BASE_URL)
+
+                # Rotate only the UA — a single item assignment instead of
+                # rebuilding the session's case-insensitive header dict
+                self.sess.headers['User-Agent'] = random.choice(_UA_POOL)
+
+
+                logger.debug("Requesting URL: %s?q=%s&start=%s", SCHOLARS_BASE_URL, query, start)
+
+
                 # Add parameters to avoid bot detection
                 params = {
                     'q': query,
@@ -129,46 +319,39 @@ class SciHub(object):
                     timeout=30
                 )
                 
-                print(f"Response status code: {res.status_code}")
-                
+                logger.debug("Response status code: %s", res.status_code)
+
                 if res.status_code == 429:
-                    print("Rate limit reached. Waiting 60 seconds...")
-                    time.sleep(60)
+                    logger.info("Rate limit reached. Throttling request rate...")
+                    self._bucket_for(SCHOLARS_BASE_URL).penalize()
+                    time.sleep(self._bucket_for(SCHOLARS_BASE_URL).acquire())
                     continue
-                
+
                 if res.status_code != 200:
-                    print(f"Error response content: {res.content}")
+                    logger.debug("Error response content: %s", res.content)
                     results['err'] = f'Search failed with status code {res.status_code}'
                     return results
 
-                s = self._get_soup(res.content)
-                papers = s.find_all('div', class_="gs_r")
+                doc = lxml.html.fromstring(res.content)
+                papers = _RESULT_XP(doc)
 
                 if not papers:
-                    if 'CAPTCHA' in str(res.content):
+                    if b'CAPTCHA' in res.content:
                         results['err'] = 'Failed to complete search with query %s (captcha)' % query
                     return results
 
                 for paper in papers:
-                    if not paper.find('table'):
-                        source = None
-                        pdf = paper.find('div', class_='gs_ggs gs_fl')
-                        link = paper.find('h3', class_='gs_rt')
-
-                        if pdf:
-                            source = pdf.find('a')['href']
-                        elif link.find('a'):
-                            source = link.find('a')['href']
-                        else:
-                            continue
+                    source = (_PDF_XP(paper) or _LINK_XP(paper) or [None])[0]
+                    if not source:
+                        continue
 
-                        results['papers'].append({
-                            'name': link.text,
-                            'url': source
-                        })
+                    results['papers'].append({
+                        'name': _TITLE_XP(paper),
+                        'url': source
+                    })
 
-                        if len(results['papers']) >= limit:
-                            return results
+                    if len(results['papers']) >= limit:
+                        return results
 
                 start += 10
 
@@ -185,24 +368,42 @@ class SciHub(object):
         """
         data = self.fetch(identifier)
 
-        if not data.get('pdf'):
-            return {'err': 'Failed to fetch PDF for the paper'}
-            
+        if not data.get('pdf_path'):
+            return {'err': data.get('err', 'Failed to fetch PDF for the paper')}
+
         if not path:
             path = os.path.join(destination, data['name'])
-        
+
         # Clean up the filename
         path = path.replace('?download=true', '')  # Remove download parameter
         if not path.endswith('.pdf'):
             path += '.pdf'
-        
-        # Verify we have PDF content
-        if data['pdf'].startswith(b'%PDF-'):
-            self._save(data['pdf'], path)
+
+        # Check the magic bytes without reading the file back into memory
+        fd = os.open(data['pdf_path'], os.O_RDONLY)
+        try:
+            magic = os.pread(fd, 5, 0)
+        finally:
+            os.close(fd)
+
+        if magic == b'%PDF-':
+            try:
+                os.replace(data['pdf_path'], path)
+            except OSError:
+                # Temp dir on a different filesystem; fall back to a copy
+                shutil.move(data['pdf_path'], path)
             return {'name': os.path.basename(path)}
         else:
+            os.remove(data['pdf_path'])
             return {'err': 'Downloaded content is not a valid PDF'}
 
+    async def adownload(self, identifier, destination='', path=None):
+        """
+        Async variant of download: the blocking session I/O runs on a worker
+        thread so several downloads can overlap on one event loop.
+        """
+        return await asyncio.to_thread(self.download, identifier, destination, path)
+
     def fetch(self, identifier):
         """
         Fetches the paper by first retrieving the direct link to the pdf.
@@ -213,27 +414,70 @@ class SciHub(object):
                 if not url:
                     return {'err': f'Unable to find valid URL for identifier: {identifier}'}
                     
-                res = self.sess.get(url, verify=False, timeout=30)
-
-                if not res.headers.get('Content-Type', '').startswith('application/pdf'):
-                    if 'captcha' in res.text.lower():
+                self._throttle(url)
+                # HEAD first: spot captcha pages without pulling the body,
+                # sniffing only the first 4 KB for markers. The probe is
+                # advisory — some mirrors reject HEAD outright (405) or
+                # mislabel Content-Type while the GET still serves a PDF,
+                # so a non-PDF answer falls through to the streaming GET,
+                # whose magic-byte check is the real gate.
+                head = self.sess.head(url, allow_redirects=True, verify=False, timeout=15)
+                content_type = head.headers.get('Content-Type', '')
+                if head.status_code != 200 or not content_type.startswith('application/pdf'):
+                    if self._probe_captcha(url):
+                        logger.info(f'Encountered CAPTCHA. Attempt {attempt + 1}/{self.max_retries}')
+                        # Race other (proxy, mirror) combos before
+                        # falling back to the blocking captcha wait
+                        raced = self._race_alternatives(url)
+                        if raced:
+                            tmp_path, digest, final_url = raced
+                            return {
+                                'pdf_path': tmp_path,
+                                'hash': digest,
+                                'url': url,
+                                'name': self._generate_name(final_url, digest)
+                            }
                         if not self._handle_captcha():
                             return {'err': 'Failed to bypass CAPTCHA'}
                         continue
-                    return {'err': f'Response is not a PDF (Content-Type: {res.headers.get("Content-Type")})'}
-                
+
+                with self.sess.get(url, stream=True, verify=False, timeout=30) as res:
+                    body = res.iter_content(1 << 20)
+                    head_chunk = next(body, b'')
+                    # O(1) magic check before paying for MD5 and disk writes
+                    if not head_chunk.startswith(b'%PDF-'):
+                        return {'err': 'Response body is not a PDF'}
+
+                    # Stream to a temp file and hash incrementally so a
+                    # 30 MB paper never sits in memory as one bytes object;
+                    # the 1 MB file buffer batches the write syscalls
+                    pdf_hash = hashlib.md5(usedforsecurity=False)
+                    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False,
+                                                     buffering=1 << 20) as tmp:
+                        pdf_hash.update(head_chunk)
+                        tmp.write(head_chunk)
+                        for chunk in body:
+                            pdf_hash.update(chunk)
+                            tmp.write(chunk)
+                        tmp_path = tmp.name
+                    final_url = res.url
+
                 return {
-                    'pdf': res.content,
+                    'pdf_path': tmp_path,
+                    'hash': pdf_hash.hexdigest(),
                     'url': url,
-                    'name': self._generate_name(res)
+                    'name': self._generate_name(final_url, pdf_hash.hexdigest())
                 }
 
+            except requests.exceptions.ConnectionError:
+                logger.info('Cannot access {}, changing url'.format(self.available_base_url_list[0]))
+                self._change_base_url()
+
             except requests.exceptions.RequestException as e:
+                # Transport retries are the adapter's job; anything that
+                # still escapes it is not worth another Python-level loop
                 logger.error(f'Request failed: {str(e)}')
-                if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay)
-                    continue
-                return {'err': f'Failed to fetch PDF after {self.max_retries} attempts'}
+                return {'err': f'Failed to fetch PDF: {str(e)}'}
 
         return {'err': 'Maximum retries exceeded'}
 
@@ -279,9 +523,9 @@ class SciHub(object):
                     identifier = f"https://www.{identifier}"
 
             # Add timeout and better error handling
+            self._throttle(self.base_url)
             res = self.sess.get(
-                self.base_url + identifier, 
-                headers=self._get_random_headers(),
+                self.base_url + identifier,
                 verify=False,
                 timeout=30
             )
@@ -310,19 +554,13 @@ class SciHub(object):
                 if embed and embed.get('src'):
                     pdf_url = embed.get('src')
             
-            # Method 3: regex patterns
+            # Method 3: regex patterns (search, not findall — only the
+            # first match matters, so we avoid a full-text scan per pattern)
             if not pdf_url:
-                patterns = [
-                    r'iframe src="(.*?)"',
-                    r"location.href='(.*?)'",
-                    r'pdf_url\s*=\s*[\'"]([^\'"]+)[\'"]',
-                    r'<embed src="(.*?)"'
-                ]
-                
-                for pattern in patterns:
-                    matches = re.findall(pattern, res.text)
-                    if matches:
-                        pdf_url = matches[0]
+                for pattern in _PDF_PATTERNS:
+                    m = pattern.search(res.text)
+                    if m:
+                        pdf_url = m.group(1)
                         break
             
             if pdf_url:
@@ -362,25 +600,11 @@ class SciHub(object):
     def _clean_pdf_url(self, pdf_url):
         """Clean and construct proper PDF URL"""
         if pdf_url.startswith('/'):
-            base_domain = urllib.parse.urlparse(self.base_url).netloc
-            return f"https://{base_domain}{pdf_url}"
+            return self._base_scheme_host + pdf_url
         elif pdf_url.startswith('//'):
             return 'https:' + pdf_url
         elif not pdf_url.startswith('http'):
-            base_domain = urllib.parse.urlparse(self.base_url).netloc
-            return f"https://{base_domain}/{pdf_url.lstrip('/')}"
-        return pdf_url
-
-    def _clean_pdf_url(self, pdf_url):
-        """Clean and construct proper PDF URL"""
-        if pdf_url.startswith('/'):
-            base_domain = urllib.parse.urlparse(self.base_url).netloc
-            return f"https://{base_domain}{pdf_url}"
-        elif pdf_url.startswith('//'):
-            return 'https:' + pdf_url
-        elif not pdf_url.startswith('http'):
-            base_domain = urllib.parse.urlparse(self.base_url).netloc
-            return f"https://{base_domain}/{pdf_url.lstrip('/')}"
+            return self._base_scheme_host + '/' + pdf_url.lstrip('/')
         return pdf_url
 
     def _classify(self, identifier):
@@ -391,40 +615,127 @@ class SciHub(object):
         pmid - PubMed ID
         doi - digital object identifier
         """
-        if (identifier.startswith('http') or identifier.startswith('https')):
-            if identifier.endswith('pdf'):
-                return 'url-direct'
-            else:
-                return 'url-non-direct'
-        elif identifier.isdigit():
-            return 'pmid'
-        else:
+        m = _CLASSIFY_RE.match(identifier)
+        if not m:
             return 'doi'
-
-    def _save(self, data, path):
-        """
-        Save a file give data and a path.
-        """
-        with open(path, 'wb') as f:
-            f.write(data)
+        if m['direct']:
+            return 'url-direct'
+        if m['url']:
+            return 'url-non-direct'
+        if m['pmid']:
+            return 'pmid'
+        return 'doi'
 
     def _get_soup(self, html):
         """
         Return html soup.
         """
-        return BeautifulSoup(html, 'html.parser')
+        return BeautifulSoup(html, 'lxml')
 
-    def _generate_name(self, res):
+    def _generate_name(self, url, pdf_hash):
         """
-        Generate unique filename for paper. Returns a name by calcuating 
-        md5 hash of file contents, then appending the last 20 characters
-        of the url which typically provides a good paper identifier.
+        Generate unique filename for paper. Returns a name by combining the
+        (incrementally computed) md5 hash of file contents with the last 20
+        characters of the url which typically provides a good paper identifier.
         """
-        name = res.url.split('/')[-1]
-        name = re.sub('#view=(.+)', '', name)
-        pdf_hash = hashlib.md5(res.content).hexdigest()
+        name = url.split('/')[-1]
+        name = _NAME_STRIP.sub('', name)
         return '%s-%s' % (pdf_hash, name[-20:])
 
+    def _probe_captcha(self, url):
+        """
+        Range-GET the first 4 KB of a non-PDF response and look for captcha
+        markers, instead of downloading the whole error page.
+        """
+        probe = self.sess.get(url, headers={'Range': 'bytes=0-4095'},
+                              stream=True, verify=False, timeout=15)
+        try:
+            return b'captcha' in next(probe.iter_content(4096), b'').lower()
+        finally:
+            probe.close()
+
+    def _clone_session(self, proxy):
+        """Session bound to one proxy, sharing the pooled adapter"""
+        sess = requests.Session()
+        sess.headers = self._get_random_headers()
+        adapter = self.sess.get_adapter('https://')
+        sess.mount('https://', adapter)
+        sess.mount('http://', adapter)
+        if proxy:
+            sess.proxies = {'http': proxy, 'https': proxy}
+        return sess
+
+    def _race_combo(self, proxy, mirror, url):
+        """
+        One (proxy, mirror) attempt: rewrite the pdf url onto the mirror's
+        host and stream it down. Returns (tmp_path, hash, final_url) for a
+        PDF response, None when the combo is captcha-blocked.
+        """
+        target = urllib.parse.urlparse(url)._replace(
+            scheme='https', netloc=urllib.parse.urlparse(mirror).netloc).geturl()
+        self._throttle(target)
+        sess = self._clone_session(proxy)
+        with sess.get(target, stream=True, verify=False, timeout=30) as res:
+            if not res.headers.get('Content-Type', '').startswith('application/pdf'):
+                return None
+            body = res.iter_content(1 << 20)
+            head_chunk = next(body, b'')
+            if not head_chunk.startswith(b'%PDF-'):
+                return None
+            pdf_hash = hashlib.md5(usedforsecurity=False)
+            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False,
+                                             buffering=1 << 20) as tmp:
+                pdf_hash.update(head_chunk)
+                tmp.write(head_chunk)
+                for chunk in body:
+                    pdf_hash.update(chunk)
+                    tmp.write(chunk)
+                tmp_path = tmp.name
+            return tmp_path, pdf_hash.hexdigest(), res.url
+
+    def _race_alternatives(self, url):
+        """
+        Fan the blocked request out across (proxy, mirror) combos in parallel
+        and take the first PDF response; the sleep that a single retry would
+        spend waiting is amortized across all attempts. Returns None when
+        every combo is blocked too.
+        """
+        combos = [(proxy, mirror)
+                  for proxy in [None] + self.proxy_list
+                  for mirror in self.available_base_url_list]
+        if not combos:
+            return None
+        with ThreadPoolExecutor(max_workers=min(4, len(combos))) as pool:
+            futures = [pool.submit(self._race_combo, proxy, mirror, url)
+                       for proxy, mirror in combos[:4]]
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except requests.exceptions.RequestException:
+                    continue
+                if result:
+                    # cancel() only stops queued combos; racers already in
+                    # flight finish regardless (the pool exit waits on
+                    # them), and any that also fetched a PDF left a
+                    # delete=False temp file that must be reaped
+                    for pending in futures:
+                        if pending is not future:
+                            pending.cancel()
+                    for pending in futures:
+                        if pending is future or pending.cancelled():
+                            continue
+                        try:
+                            loser = pending.result()
+                        except requests.exceptions.RequestException:
+                            continue
+                        if loser:
+                            try:
+                                os.remove(loser[0])
+                            except OSError:
+                                pass
+                    return result
+        return None
+
     def _rotate_proxy(self):
         """Rotate to next proxy in the list"""
         if self.proxy_list:
@@ -433,47 +744,6 @@ class SciHub(object):
             self.set_proxy(new_proxy)
             logger.info(f"Rotating to proxy: {new_proxy}")
 
-    def fetch(self, identifier):
-        """
-        Fetches the paper by first retrieving the direct link to the pdf.
-        """
-        max_retries = 3
-        retry_delay = 30  # Initial delay in seconds
-        
-        for attempt in range(max_retries):
-            try:
-                url = self._get_direct_url(identifier)
-                res = self.sess.get(url, verify=False)
-
-                if res.headers['Content-Type'] != 'application/pdf':
-                    if 'captcha' in res.text.lower():
-                        self._rotate_proxy()  # Try a different proxy
-                        logger.info(f'Encountered CAPTCHA. Attempt {attempt + 1}/{max_retries}')
-                        if attempt < max_retries - 1:
-                            wait_time = retry_delay * (2 ** attempt)  # Exponential backoff
-                            logger.info(f'Waiting {wait_time} seconds before retrying...')
-                            time.sleep(wait_time)
-                            self._change_base_url()  # Try a different mirror
-                            continue
-                        
-                    raise CaptchaNeedException('Failed to fetch pdf due to captcha')
-                
-                return {
-                    'pdf': res.content,
-                    'url': url,
-                    'name': self._generate_name(res)
-                }
-
-            except requests.exceptions.ConnectionError:
-                logger.info('Cannot access {}, changing url'.format(self.available_base_url_list[0]))
-                self._change_base_url()
-
-            except requests.exceptions.RequestException as e:
-                logger.info('Failed to fetch pdf: %s' % str(e))
-                return {'err': 'Failed to fetch pdf due to request exception'}
-
-        return {'err': 'Failed to fetch pdf after maximum retries'}
-
     def _handle_captcha(self):
         """Handle CAPTCHA encounter"""
         logger.info(f"CAPTCHA detected. Waiting {self.captcha_wait} seconds...")
@@ -541,13 +811,32 @@ def main():
                     logger.debug('Successfully downloaded file with identifier %s', paper['url'])
     elif args.file:
         with open(args.file, 'r') as f:
-            identifiers = f.read().splitlines()
+            # Ordered dedupe: exported bibliographies repeat identifiers
+            identifiers = list(dict.fromkeys(f.read().splitlines()))
+
+        # Warm the OS resolver cache so workers don't serialize on the
+        # first DNS lookup per mirror
+        for mirror in sh.available_base_url_list:
+            try:
+                socket.getaddrinfo(urllib.parse.urlparse(mirror).netloc, 443)
+            except socket.gaierror:
+                pass
+
+        def _report(identifier, result):
+            if 'err' in result:
+                logger.debug('%s', result['err'])
+            else:
+                logger.debug('Successfully downloaded file with identifier %s', identifier)
+
+        if len(identifiers) > 4:
+            # Overlap TCP/TLS waits across workers sharing the pooled adapter
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                results = executor.map(lambda i: sh.download(i, args.output), identifiers)
+                for identifier, result in zip(identifiers, results):
+                    _report(identifier, result)
+        else:
             for identifier in identifiers:
-                result = sh.download(identifier, args.output)
-                if 'err' in result:
-                    logger.debug('%s', result['err'])
-                else:
-                    logger.debug('Successfully downloaded file with identifier %s', identifier)
+                _report(identifier, sh.download(identifier, args.output))
 
 
 if __name__ == '__main__':
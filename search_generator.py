@@ -1,11 +1,15 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
+import asyncio
+import logging
 import os
+import random
 from dotenv import load_dotenv
 from scihub import SciHub
-import time
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 SYSTEM_PROMPT = """You are an expert at converting research interests into effective academic search queries. 
 Given a description of research interests or topics, generate 3-5 specific keyword-based search queries that will find relevant academic papers. Focus on conceptual papers, like reviews.
 
@@ -20,88 +24,151 @@ Guidelines:
 
 class SearchQueryGenerator:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
         self.scihub = SciHub()
         self.input_dir = "input"
         os.makedirs(self.input_dir, exist_ok=True)
 
-    def generate_queries(self, research_description):
-        response = self.client.chat.completions.create(
+    @staticmethod
+    def _clean_query(q):
+        # Remove numbering and leading/trailing whitespace; keep the
+        # quotes and operators in the query
+        q = q.strip()
+        q = q.lstrip('123456789.').strip()
+        return q
+
+    async def agenerate_queries(self, research_description, on_query=None):
+        """
+        Stream query generation; each completed line is cleaned and handed
+        to on_query immediately so downstream work starts while the model
+        is still writing the remaining queries.
+        """
+        stream = await self.client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": f"Generate keyword-based search queries for: {research_description}"}
             ],
-            temperature=0.7
+            temperature=0.7,
+            stream=True
         )
-        
-        # Clean up the queries by removing numbering and quotes
-        queries = response.choices[0].message.content.strip().split('\n')
+
         cleaned_queries = []
-        for q in queries:
-            # Remove numbering and leading/trailing whitespace
-            q = q.strip()
-            q = q.lstrip('123456789.').strip()
-            # Keep the quotes and operators in the query
-            if q:
-                cleaned_queries.append(q)
-        
+        buffer = ''
+        async for chunk in stream:
+            buffer += chunk.choices[0].delta.content or ''
+            while '\n' in buffer:
+                line, buffer = buffer.split('\n', 1)
+                query = self._clean_query(line)
+                if query:
+                    cleaned_queries.append(query)
+                    if on_query:
+                        on_query(query)
+        query = self._clean_query(buffer)
+        if query:
+            cleaned_queries.append(query)
+            if on_query:
+                on_query(query)
+
         return cleaned_queries
 
-    def download_papers(self, queries, limit_per_query=1):
+    def generate_queries(self, research_description):
+        return asyncio.run(self.agenerate_queries(research_description))
+
+    async def _agenerate_and_download(self, research_description, total_limit, max_concurrent=5):
+        # Hide LLM latency behind the first searches: every streamed query
+        # line immediately spawns its search-and-download task
+        semaphore = asyncio.Semaphore(max_concurrent)
+        tasks = []
+
+        async def search_and_download(query):
+            logger.debug("Searching for: %s", query)
+            try:
+                results = await asyncio.to_thread(self.scihub.search, query, 1)
+            except Exception as e:
+                logger.warning("Error searching for papers: %s", str(e))
+                return []
+            if 'err' in results:
+                logger.warning("Error in search: %s", results['err'])
+                return []
+            paths = await asyncio.gather(
+                *(self._download_one(paper, semaphore) for paper in results['papers']),
+                return_exceptions=True
+            )
+            return [p for p in paths if p and not isinstance(p, Exception)]
+
+        def on_query(query):
+            tasks.append(asyncio.create_task(search_and_download(query)))
+
+        await self.agenerate_queries(research_description, on_query=on_query)
+
         downloaded_files = []
-        total_papers_needed = limit_per_query  # Now this is the total papers we want
-        
+        for paths in await asyncio.gather(*tasks):
+            downloaded_files.extend(paths)
+        return downloaded_files[:total_limit]
+
+    def generate_and_download(self, research_description, total_limit=1):
+        """Generate queries and download papers in one interleaved pass"""
+        return asyncio.run(self._agenerate_and_download(research_description, total_limit))
+
+    async def _download_one(self, paper, semaphore):
+        """Download a single paper under the concurrency cap"""
+        async with semaphore:
+            logger.debug("Attempting to download: %s", paper['name'])
+
+            # Generate a safe filename
+            safe_name = "".join(x for x in paper['name'][:50] if x.isalnum() or x in (' ', '-', '_'))
+            filename = f"{safe_name}.pdf"
+            filepath = os.path.join(self.input_dir, filename)
+
+            result = await self.scihub.adownload(paper['url'], destination=self.input_dir)
+
+            # Politeness delay: overlaps across workers instead of serializing
+            await asyncio.sleep(random.uniform(2, 4))
+
+            if 'err' not in result:
+                logger.info("Successfully downloaded: %s", filename)
+                return filepath
+
+            logger.warning("Error downloading paper: %s", result['err'])
+            return None
+
+    async def _adownload_papers(self, queries, total_limit, max_concurrent=5):
+        # Searches stay sequential (Scholar rate-limits aggressively), but the
+        # downloads they produce fan out concurrently under a semaphore
+        papers = []
         for query in queries:
-            # Stop if we've already downloaded enough papers in total
-            if len(downloaded_files) >= total_papers_needed:
+            if len(papers) >= total_limit:
                 break
-            
-            print(f"\nSearching for: {query}")
+
+            logger.debug("Searching for: %s", query)
             try:
-                results = self.scihub.search(query, limit=1)  # Only search for one at a time
-                
-                if 'err' in results:
-                    print(f"Error in search: {results['err']}")
-                    continue
-                
-                print(f"Found {len(results['papers'])} papers")
-                
-                for paper in results['papers']:
-                    # Stop if we've reached our total limit
-                    if len(downloaded_files) >= total_papers_needed:
-                        break
-                        
-                    try:
-                        print(f"\nAttempting to download: {paper['name']}")
-                        
-                        # Generate a safe filename
-                        safe_name = "".join(x for x in paper['name'][:50] if x.isalnum() or x in (' ', '-', '_'))
-                        filename = f"{safe_name}.pdf"
-                        filepath = os.path.join(self.input_dir, filename)
-                        
-                        # Download the paper
-                        result = self.scihub.download(paper['url'], destination=self.input_dir)
-                        
-                        if 'err' not in result:
-                            print(f"Successfully downloaded: {filename}")
-                            downloaded_files.append(filepath)
-                        else:
-                            print(f"Error downloading paper: {result['err']}")
-                        
-                        # Add delay between downloads
-                        time.sleep(3)
-                        
-                    except Exception as e:
-                        print(f"Error downloading paper: {str(e)}")
-                        continue
-                    
+                results = await asyncio.to_thread(self.scihub.search, query, 1)
             except Exception as e:
-                print(f"Error searching for papers: {str(e)}")
+                logger.warning("Error searching for papers: %s", str(e))
+                continue
+
+            if 'err' in results:
+                logger.warning("Error in search: %s", results['err'])
                 continue
-            
-            # Add delay between queries
-            time.sleep(5)
-        
+
+            logger.debug("Found %d papers", len(results['papers']))
+            papers.extend(results['papers'])
+
+        semaphore = asyncio.Semaphore(max_concurrent)
+        tasks = [self._download_one(paper, semaphore) for paper in papers[:total_limit]]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        downloaded_files = []
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning("Error downloading paper: %s", str(result))
+            elif result:
+                downloaded_files.append(result)
+
         return downloaded_files
 
+    def download_papers(self, queries, limit_per_query=1):
+        # limit_per_query is the total number of papers we want
+        return asyncio.run(self._adownload_papers(queries, limit_per_query))
+
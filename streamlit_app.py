@@ -3,21 +3,33 @@ from main import PodcastWorkflow
 import os
 from pathlib import Path
 
+@st.cache_resource
+def _get_workflow(papers_per_query):
+    # One PodcastWorkflow per papers_per_query value, shared across
+    # reruns and sessions — re-initializing rebuilt the SciHub session,
+    # mirror list, and directory scaffolding on every click
+    return PodcastWorkflow(papers_per_query=papers_per_query)
+
+@st.cache_data
+def _podcast_title(path, mtime):
+    # mtime keys the cache so a regenerated file recomputes its title
+    return Path(path).stem.replace('_', ' ').title()
+
+# Session defaults applied once per rerun; add new keys here rather
+# than growing initialize_session_state
+SESSION_DEFAULTS = {
+    'workflow': None,
+    'processing_complete': False,
+    'testing_mode': False,
+    'llm_choice': "OpenAI",
+    'openai_api_key': "",
+    'anthropic_api_key': "",
+    'elevenlabs_api_key': "",
+}
+
 def initialize_session_state():
-    if 'workflow' not in st.session_state:
-        st.session_state.workflow = None
-    if 'processing_complete' not in st.session_state:
-        st.session_state.processing_complete = False
-    if 'testing_mode' not in st.session_state:
-        st.session_state.testing_mode = False
-    if 'llm_choice' not in st.session_state:
-        st.session_state.llm_choice = "OpenAI"
-    if 'openai_api_key' not in st.session_state:
-        st.session_state.openai_api_key = ""
-    if 'anthropic_api_key' not in st.session_state:
-        st.session_state.anthropic_api_key = ""
-    if 'elevenlabs_api_key' not in st.session_state:
-        st.session_state.elevenlabs_api_key = ""
+    for key, value in SESSION_DEFAULTS.items():
+        st.session_state.setdefault(key, value)
 
 def main():
     st.title("Research Paper Podcast Generator")
@@ -87,7 +99,7 @@ def main():
     )
     
     if st.button("Initialize Workflow"):
-        st.session_state.workflow = PodcastWorkflow(papers_per_query=papers_count)
+        st.session_state.workflow = _get_workflow(papers_count)
         st.success("Workflow initialized!")
 
     # Main content
@@ -102,33 +114,84 @@ def main():
         help="Enter keywords or a description of the research topics you're interested in"
     )
 
+    transcript_model = st.selectbox(
+        "Transcript model",
+        options=["gpt-4o-mini", "gpt-4-turbo-preview"],
+        help="gpt-4o-mini is faster and ~10x cheaper; papers whose output fails validation are retried on gpt-4-turbo-preview automatically"
+    )
+
+    use_batch = st.checkbox(
+        "Use Batch API (cheaper, ~1h)",
+        help="Route transcript generation through OpenAI's Batch API: about half the cost, but results can take up to an hour or more"
+    )
+
+    group_papers = st.checkbox(
+        "Group short papers per request",
+        help="Marshal up to three short papers into each transcript request to cut per-call overhead; runs the stages sequentially"
+    )
+
+    force_regenerate = st.checkbox(
+        "Force regenerate",
+        help="Ignore the resume manifest and rerun every stage even for papers already processed"
+    )
+
     # Process button
     if st.button("Generate Podcasts"):
         if not research_description:
             st.error("Please enter research interests before proceeding.")
             return
 
+        # The cached workflow object outlives this rerun; keep its resume
+        # behavior in sync with the checkbox
+        st.session_state.workflow.force_regenerate = force_regenerate
+
         with st.spinner("Generating search queries and downloading papers..."):
             if st.session_state.workflow.generate_search_and_download(research_description):
                 st.success("Papers downloaded successfully!")
-                
-                with st.spinner("Processing PDFs..."):
-                    processed_names = st.session_state.workflow.process_new_pdfs()
-                    if processed_names:
-                        st.success("PDFs processed successfully!")
-                        
-                        with st.spinner("Generating transcripts..."):
-                            if st.session_state.workflow.generate_transcripts():
-                                st.success("Transcripts generated successfully!")
-                                
-                                with st.spinner("Creating podcasts..."):
-                                    if st.session_state.workflow.create_podcasts():
-                                        st.success("Podcasts created successfully!")
-                                        st.session_state.processing_complete = True
-                            else:
-                                st.error("Failed to generate transcripts.")
-                    else:
-                        st.error("No PDFs were successfully processed.")
+
+                if use_batch or group_papers:
+                    # The Batch API is one asynchronous round-trip and
+                    # grouping wants every cleaned paper up front, so the
+                    # stages can't overlap; keep the sequential flow here
+                    with st.spinner("Processing PDFs..."):
+                        processed_names = st.session_state.workflow.process_new_pdfs()
+                        if processed_names:
+                            st.success("PDFs processed successfully!")
+
+                            with st.spinner("Generating transcripts..."):
+                                if st.session_state.workflow.generate_transcripts(
+                                        use_batch=use_batch, group=group_papers):
+                                    st.success("Transcripts generated successfully!")
+
+                                    with st.spinner("Creating podcasts..."):
+                                        if st.session_state.workflow.create_podcasts():
+                                            st.success("Podcasts created successfully!")
+                                            st.session_state.processing_complete = True
+                                else:
+                                    st.error("Failed to generate transcripts.")
+                        else:
+                            st.error("No PDFs were successfully processed.")
+                else:
+                    stage_labels = {
+                        'pdf': "Processing PDF",
+                        'transcript': "Writing transcript",
+                        'audio': "Synthesizing audio",
+                    }
+                    with st.status("Generating podcasts...", expanded=True) as status:
+                        def on_status(stage, name):
+                            st.write(f"{stage_labels[stage]}: {name}")
+
+                        completed = st.session_state.workflow.run_pipeline(
+                            on_status=on_status, model=transcript_model)
+
+                        if completed:
+                            status.update(
+                                label=f"Generated {len(completed)} podcast(s)",
+                                state="complete")
+                            st.session_state.processing_complete = True
+                        else:
+                            status.update(label="No podcasts were generated",
+                                          state="error")
             else:
                 st.error("Failed to download papers.")
 
@@ -149,21 +212,31 @@ def main():
                 st.write(f"- Query: {query}")
                 st.write(f"  Error: {error}")
 
-        # Display generated podcasts
+        # Display generated podcasts, newest first. Each st.audio call
+        # gets the file path so Streamlit streams it with range requests
+        # instead of this script loading every MP3 into memory per rerun.
         output_dir = Path(os.getcwd()) / "outputs"
-        podcast_files = list(output_dir.glob("*.mp3"))
-        
+        podcast_files = sorted(output_dir.glob("*.mp3"),
+                               key=lambda p: -p.stat().st_mtime)
+
         if podcast_files:
             st.subheader("Generated Podcasts")
-            for podcast in podcast_files:
-                # Extract title from filename (removing .mp3 extension)
-                title = podcast.stem.replace('_', ' ').title()
-                
+
+            page_size = 10
+            num_pages = (len(podcast_files) + page_size - 1) // page_size
+            if num_pages > 1:
+                page = st.selectbox("Page", options=range(1, num_pages + 1))
+            else:
+                page = 1
+            start = (page - 1) * page_size
+
+            for podcast in podcast_files[start:start + page_size]:
+                title = _podcast_title(str(podcast), podcast.stat().st_mtime)
+
                 # Create a container for each podcast
                 with st.container():
                     st.write(f"**{title}**")
-                    with open(podcast, "rb") as f:
-                        st.audio(f.read(), format="audio/mp3")
+                    st.audio(str(podcast), format="audio/mp3")
                     st.divider()  # Add a visual separator between podcasts
 
 if __name__ == "__main__":
@@ -1,9 +1,22 @@
+import charset_normalizer
+import httpx
+import jsonschema
 import openai
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+import asyncio
+import functools
+import hashlib
+import json
+import mmap
 import pickle
+import random
+import tempfile
+import time
 import warnings
+import weakref
 import os
 from dotenv import load_dotenv
+from rate_limiter import RateLimiter
 import ast
 
 warnings.filterwarnings('ignore')
@@ -11,7 +24,53 @@ warnings.filterwarnings('ignore')
 # Load environment variables from .env file
 load_dotenv()
 
-# System prompt for setting the context
+# One client for the whole module: the underlying httpx client is
+# thread-safe and pools keep-alive connections across concurrent calls.
+# The strict timeout bounds tail latency — with the provider default
+# (10 min) a single hung request stalls the whole pipeline.
+_HTTP_TIMEOUT = httpx.Timeout(90.0, connect=5.0)
+_HTTP_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=32)
+
+client = OpenAI(
+    api_key=os.getenv('OPENAI_API_KEY'),
+    timeout=_HTTP_TIMEOUT,
+    max_retries=2,
+    http_client=httpx.Client(limits=_HTTP_LIMITS)
+)
+# Async clients are created per event loop, not per module: pooled
+# keep-alive connections are bound to the loop that opened them, and the
+# callers here each start a fresh loop via asyncio.run — a connection
+# left over from a previous (now closed) loop would raise
+# "RuntimeError: Event loop is closed" on reuse. The WeakKeyDictionary
+# drops a loop's client once the loop itself is garbage-collected.
+_ACLIENTS = weakref.WeakKeyDictionary()
+
+def _get_aclient():
+    loop = asyncio.get_running_loop()
+    aclient = _ACLIENTS.get(loop)
+    if aclient is None:
+        # The async path carries its own backoff loop, so SDK retries stay off
+        aclient = AsyncOpenAI(
+            api_key=os.getenv('OPENAI_API_KEY'),
+            timeout=_HTTP_TIMEOUT,
+            max_retries=0,
+            http_client=httpx.AsyncClient(limits=_HTTP_LIMITS)
+        )
+        _ACLIENTS[loop] = aclient
+    return aclient
+
+# First-pass model: several times faster and ~10x cheaper than the
+# fallback, with comparable dialogue quality; structurally bad output
+# escalates to the stronger tier
+MODEL = "gpt-4o-mini"
+FALLBACK_MODEL = "gpt-4-turbo-preview"
+
+# System prompt for setting the context. The style guide and examples
+# below deliberately push the static prefix past the ~1024-token floor
+# for OpenAI's automatic prompt caching, so every call after the first
+# gets the system message served from cache at reduced cost and latency.
+# Keep this string byte-identical across calls (no per-paper data here —
+# that belongs in the user message) or the cached prefix is invalidated.
 SYSTEM_PROMPT = """You are an AI trained to convert academic papers into engaging podcast transcripts. Create a natural, 10-minute conversation between two speakers discussing the key points, implications, and insights from the provided paper.
 
 Guidelines:
@@ -22,7 +81,94 @@ Guidelines:
 - Address potential implications and future research directions
 - Maintain a conversational, engaging tone
 - Ensure balanced participation between speakers
-- End with key takeaways"""
+- End with key takeaways
+
+Speaker roles:
+- Speaker 1 is the host. They steer the conversation, set up each topic with a
+  question or a short framing remark, react to surprising results, and keep the
+  discussion moving at a comfortable pace. The host speaks for a general but
+  curious audience: they ask the clarifying questions a smart listener would
+  ask, push back gently when a claim sounds too strong, and summarize what was
+  just said before moving on to the next section of the paper.
+- Speaker 2 is the expert. They know the paper inside out and explain it in
+  plain language. The expert leads with the intuition, then the mechanism, then
+  the evidence: first say what the idea buys you, then how it works, then what
+  the experiments actually showed. They quote concrete numbers from the paper
+  (sample sizes, effect sizes, accuracy figures, speedups) rather than vague
+  qualifiers, and they are candid about limitations, assumptions, and threats
+  to validity when the host asks.
+
+Style guide:
+- Write the way people actually talk on a good science podcast: contractions,
+  short sentences, occasional verbal signposts ("So here's the interesting
+  part...", "Right, and that's exactly where it gets tricky."). Avoid reading
+  like an abstract or a bulleted summary spoken aloud.
+- Vary turn length. Most turns should be two to four sentences; let the expert
+  take an occasional longer turn for a core explanation, and let the host drop
+  in short one-sentence reactions so the rhythm never becomes monotonous.
+- Define every technical term the first time it appears, in one clause, in the
+  flow of conversation — never stop for a dictionary-style aside.
+- Use at most one analogy per concept, and prefer analogies drawn from everyday
+  experience (traffic, cooking, libraries, sports) over other technical fields.
+- Never invent results that are not in the paper. If the paper is silent on a
+  question the host raises, the expert should say so and describe what evidence
+  would settle it.
+- Do not mention that this is a generated transcript, do not reference these
+  instructions, and do not include stage directions, sound cues, or timestamps.
+- Target roughly 1,300 to 1,600 words of dialogue in total, across at least
+  twelve turns, alternating speakers throughout.
+
+Example of the expected tone and JSON shape (openings only — your output must
+cover the entire paper at full length):
+
+{"conversation": [
+  {"speaker": "Speaker 1", "dialogue": "Welcome back to the show. Today we're digging into a paper that asks a deceptively simple question: can we predict protein folding pathways without running the full simulation? My guest has been living with this paper for the past week. Give us the headline."},
+  {"speaker": "Speaker 2", "dialogue": "The headline is that a fairly small neural network, trained on partial trajectories, matched the accuracy of simulations that take about a thousand times longer to run. The authors report 94 percent agreement on their benchmark set of 212 proteins, which honestly surprised me."},
+  {"speaker": "Speaker 1", "dialogue": "A thousand times faster is the kind of number that makes me suspicious. Where's the catch?"},
+  {"speaker": "Speaker 2", "dialogue": "Fair instinct. The catch is the training data: those partial trajectories still come from the expensive simulator, so you pay the cost once up front. Think of it like a chef who spends a year perfecting a recipe so the line cooks can reproduce it in minutes — the speedup is real, but someone did the slow work first."}
+]}
+
+A later exchange in the same conversation might look like:
+
+{"speaker": "Speaker 1", "dialogue": "Before we wrap up, what would you want to see in a follow-up study?"}
+{"speaker": "Speaker 2", "dialogue": "Two things. First, proteins outside the benchmark's size range — everything here was under 300 residues, and the authors themselves flag that as an open question. Second, an ablation on the trajectory length, because right now we don't know how little training data you could get away with."}
+
+Follow the same register, pacing, and JSON structure for every paper you are given."""
+
+# Schema for batched (multi-paper) output: one transcript per paper_id
+BATCH_RESPONSE_FORMAT = {
+    "type": "object",
+    "properties": {
+        "transcripts": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "paper_id": {
+                        "type": "string"
+                    },
+                    "conversation": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "speaker": {
+                                    "type": "string",
+                                    "enum": ["Speaker 1", "Speaker 2"]
+                                },
+                                "dialogue": {
+                                    "type": "string"
+                                }
+                            },
+                            "required": ["speaker", "dialogue"]
+                        }
+                    }
+                },
+                "required": ["paper_id", "conversation"]
+            }
+        }
+    }
+}
 
 # Define the JSON schema for structured output
 RESPONSE_FORMAT = {
@@ -47,24 +193,111 @@ RESPONSE_FORMAT = {
     }
 }
 
+# On-disk transcript cache: identical paper text under the same prompt
+# and model never goes back to the LLM
+TRANSCRIPT_CACHE_DIR = "transcript_cache"
+
+def _transcript_cache_path(paper_content, model):
+    key = hashlib.sha256((paper_content + SYSTEM_PROMPT + model).encode()).hexdigest()
+    return os.path.join(TRANSCRIPT_CACHE_DIR, f"{key}.txt")
+
+def _transcript_cache_get(paper_content, output_file, model):
+    try:
+        with open(_transcript_cache_path(paper_content, model), 'r', encoding='utf-8') as f:
+            text = f.read()
+    except OSError:
+        return None
+    _write_transcript(output_file, text)
+    return text
+
+def _transcript_cache_set(paper_content, text, model):
+    try:
+        os.makedirs(TRANSCRIPT_CACHE_DIR, exist_ok=True)
+        with open(_transcript_cache_path(paper_content, model), 'w', encoding='utf-8') as f:
+            f.write(text)
+    except OSError:
+        pass
+
+def _transcript_ok(text, min_turns=10):
+    """Structural check deciding whether to escalate to the stronger model"""
+    try:
+        conversation = json.loads(text).get('conversation', [])
+    except (json.JSONDecodeError, AttributeError):
+        return False
+    return len(conversation) >= min_turns
+
+def _validate_transcript(text):
+    """Validate against RESPONSE_FORMAT; returns an error message or None"""
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        return str(e)
+    try:
+        jsonschema.validate(data, RESPONSE_FORMAT)
+    except jsonschema.ValidationError as e:
+        return e.message
+    return None
+
+def _repair_messages(invalid_text, err):
+    return [{
+        "role": "user",
+        "content": (
+            f"Your previous response was invalid JSON: {err}\n\n"
+            f"Previous response:\n{invalid_text}\n\n"
+            "Return ONLY the corrected JSON:"
+        )
+    }]
+
+async def _arepair_transcript(invalid_text, err, model):
+    """One cheap fix-up call for a malformed transcript — far less costly
+    than regenerating from the full paper"""
+    try:
+        response = await _get_aclient().chat.completions.create(
+            model=model,
+            response_format={"type": "json_object"},
+            messages=_repair_messages(invalid_text, err),
+            temperature=0,
+            max_tokens=4000
+        )
+    except openai.OpenAIError:
+        return None
+    return response.choices[0].message.content
+
+def _repair_transcript(invalid_text, err, model):
+    """Sync twin of _arepair_transcript"""
+    try:
+        response = client.chat.completions.create(
+            model=model,
+            response_format={"type": "json_object"},
+            messages=_repair_messages(invalid_text, err),
+            temperature=0,
+            max_tokens=4000
+        )
+    except openai.OpenAIError:
+        return None
+    return response.choices[0].message.content
+
 def read_file_to_string(filename):
-    """Read file content with different encodings."""
+    """Read file content with different encodings (cached per path+mtime)."""
     try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            content = file.read()
-        return content
-    except UnicodeDecodeError:
-        encodings = ['latin-1', 'cp1252', 'iso-8859-1']
-        for encoding in encodings:
+        mtime = os.path.getmtime(filename)
+    except OSError:
+        mtime = None
+    return _read_file_cached(filename, mtime)
+
+@functools.lru_cache(maxsize=128)
+def _read_file_cached(filename, mtime):
+    # mmap lets the kernel page the file straight into our address space,
+    # and decoding happens exactly once instead of re-reading the file per
+    # candidate encoding
+    try:
+        with open(filename, 'rb') as file:
             try:
-                with open(filename, 'r', encoding=encoding) as file:
-                    content = file.read()
-                print(f"Successfully read file using {encoding} encoding.")
-                return content
-            except UnicodeDecodeError:
-                continue
-        print(f"Error: Could not decode file '{filename}' with any common encoding.")
-        return None
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    raw = mm[:]
+            except ValueError:
+                # Empty files can't be mapped
+                raw = file.read()
     except FileNotFoundError:
         print(f"Error: File '{filename}' not found.")
         return None
@@ -72,59 +305,449 @@ def read_file_to_string(filename):
         print(f"Error: Could not read file '{filename}'.")
         return None
 
+    # Fast path: nearly all cleaned text is UTF-8
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        pass
+
+    # Probe the first 64KB to pick an encoding, then decode the whole
+    # buffer once; errors='replace' keeps odd bytes from failing the read
+    best = charset_normalizer.from_bytes(raw[:65536]).best()
+    encoding = best.encoding if best else 'latin-1'
+    print(f"Successfully read file using {encoding} encoding.")
+    return raw.decode(encoding, errors='replace')
+
 def read_paper(file_path):
     """Read and preprocess the academic paper"""
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    return content
+    # Every generation path reads through here, so this rides the
+    # mmap/encoding-probe reader and its per-(path, mtime) cache
+    return read_file_to_string(file_path)
+
+# Papers above this (~30k tokens, 4 chars/token) go through map-reduce:
+# summarize sections with the cheap model, then write the transcript from
+# the concatenated summaries instead of the quadratic-cost full text
+MAX_DIRECT_TOKENS = 30000
+SUMMARY_CHUNK_TOKENS = 3000
+
+SUMMARY_PROMPT = """You are an expert at summarizing sections of academic papers.
+Summarize the provided section in about 500 tokens, preserving the key findings,
+methodology, numbers, and conclusions so a podcast script can be written from
+the summaries alone."""
+
+def _split_for_summary(paper_content, chunk_tokens=SUMMARY_CHUNK_TOKENS):
+    """Split on paragraph boundaries into ~chunk_tokens pieces (4 chars/token)"""
+    max_chars = chunk_tokens * 4
+    chunks = []
+    current = []
+    current_len = 0
+    for para in paper_content.split('\n\n'):
+        if current and current_len + len(para) > max_chars:
+            chunks.append('\n\n'.join(current))
+            current = []
+            current_len = 0
+        current.append(para)
+        current_len += len(para) + 2
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
+async def _summarize_chunk(chunk, semaphore, limiter):
+    async with semaphore:
+        if limiter:
+            await limiter.acquire(len(chunk) // 4 + 600)
+        response = await _get_aclient().chat.completions.create(
+            model=MODEL,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": chunk}
+            ],
+            temperature=0.3,
+            max_tokens=600
+        )
+        return response.choices[0].message.content or ''
+
+async def _condense_paper(paper_content, limiter=None, max_concurrency=8):
+    """Map-reduce an oversized paper into concatenated section summaries"""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    chunks = _split_for_summary(paper_content)
+    summaries = await asyncio.gather(
+        *(_summarize_chunk(chunk, semaphore, limiter) for chunk in chunks))
+    return '\n\n'.join(s for s in summaries if s)
+
+def _estimate_tokens(paper_content):
+    # ~4 chars per token for the prompt, plus the completion budget
+    return len(paper_content) // 4 + 4000
+
+def _build_messages(paper_content):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": f"""Convert this academic paper into a dialogue following the system guidelines.
+        Structure the output as a JSON object with a 'conversation' array where each entry has 'speaker' (either 'Speaker 1' or 'Speaker 2')
+        and 'dialogue' fields:
+
+        Paper content:
+        {paper_content}"""}
+    ]
+
+def _write_transcript(output_file, text):
+    with open(output_file, 'w', encoding='utf-8') as file:
+        file.write(text)
+
+# Transient provider errors worth retrying; anything else (auth, bad
+# request) fails fast
+_RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError,
+                     openai.APIConnectionError, openai.InternalServerError)
+
+def _retry_wait(attempt, max_wait=60.0):
+    """Full-jitter exponential wait: uniform over [1, min(2^attempt, max)]"""
+    return random.uniform(1.0, min(float(2 ** attempt), max_wait))
+
+async def agenerate_transcript(input_file, output_file, semaphore, limiter=None,
+                               max_attempts=6, model=MODEL):
+    """Async variant of generate_transcript gated by a shared semaphore."""
+    paper_content = await asyncio.to_thread(read_paper, input_file)
+    if not paper_content:
+        print(f"Warning: Paper content is empty for {input_file}")
+        return None
+
+    # Cache on the raw text, checked before condensing: the condenser's
+    # output is nondeterministic, so a key derived from it would never
+    # repeat — exactly for the oversized papers where a hit saves the most
+    raw_content = paper_content
+    cached = await asyncio.to_thread(_transcript_cache_get, raw_content, output_file, model)
+    if cached is not None:
+        return cached
+
+    if len(paper_content) // 4 > MAX_DIRECT_TOKENS:
+        paper_content = await _condense_paper(paper_content, limiter)
+
+    async with semaphore:
+        # Wait for request/token budget up front instead of burning the
+        # provider's 429 retry-backoff tax
+        if limiter:
+            await limiter.acquire(_estimate_tokens(paper_content))
+        for attempt in range(max_attempts):
+            try:
+                response = await _get_aclient().chat.completions.create(
+                    model=model,
+                    response_format={"type": "json_object"},
+                    messages=_build_messages(paper_content),
+                    temperature=0.7,
+                    max_tokens=4000
+                )
+                break
+            except _RETRYABLE_ERRORS:
+                if attempt == max_attempts - 1:
+                    raise
+                # Jitter decorrelates retries across the gathered tasks so
+                # a rate-limit burst doesn't retry in lockstep
+                await asyncio.sleep(_retry_wait(attempt))
+            except openai.BadRequestError as e:
+                # Deterministic failure (e.g. context overflow survived the
+                # condenser): retrying can't fix it, skip this paper
+                print(f"Skipping {input_file}: bad request ({e})")
+                return None
+
+    generated_text = response.choices[0].message.content
+    if not generated_text:
+        print(f"Warning: Received empty response for {input_file}")
+        return None
+
+    err = _validate_transcript(generated_text)
+    if err:
+        print(f"Transcript for {input_file} failed schema validation: {err}")
+        repaired = await _arepair_transcript(generated_text, err, model)
+        if repaired and _validate_transcript(repaired) is None:
+            generated_text = repaired
+            err = None
+
+    if (err or not _transcript_ok(generated_text)) and model != FALLBACK_MODEL:
+        print(f"Transcript from {model} failed validation; escalating to {FALLBACK_MODEL}")
+        return await agenerate_transcript(input_file, output_file, semaphore,
+                                          limiter, max_attempts, model=FALLBACK_MODEL)
+
+    await asyncio.to_thread(_write_transcript, output_file, generated_text)
+    await asyncio.to_thread(_transcript_cache_set, raw_content, generated_text, model)
+    return generated_text
+
+async def run_all(file_pairs, max_concurrency=20,
+                  max_requests_per_minute=50, max_tokens_per_minute=80000,
+                  model=MODEL):
+    """
+    Drive every (input_file, output_file) pair on one event loop; the
+    semaphore caps in-flight requests while the rate limiter keeps the
+    batch under the provider's RPM/TPM ceiling.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limiter = RateLimiter(max_requests_per_minute, max_tokens_per_minute)
+    return await asyncio.gather(
+        *(agenerate_transcript(input_file, output_file, semaphore, limiter, model=model)
+          for input_file, output_file in file_pairs),
+        return_exceptions=True
+    )
+
+def _bin_papers(file_pairs, k, token_budget):
+    """
+    Pack papers into groups of at most k whose combined size fits the
+    token budget; papers too large to share a request come back separately.
+    """
+    bins = []
+    oversized = []
+    current = []
+    current_tokens = 0
+    for input_file, output_file in file_pairs:
+        content = read_paper(input_file)
+        if not content:
+            continue
+        tokens = len(content) // 4
+        if tokens > token_budget:
+            oversized.append((input_file, output_file))
+            continue
+        if current and (len(current) >= k or current_tokens + tokens > token_budget):
+            bins.append(current)
+            current = []
+            current_tokens = 0
+        current.append((input_file, output_file, content))
+        current_tokens += tokens
+    if current:
+        bins.append(current)
+    return bins, oversized
+
+def generate_transcripts_batched(file_pairs, k=3, token_budget=60000):
+    """
+    Row-marshal up to k short papers into a single chat completion. Each
+    request amortizes the network and queue overhead across k papers; a
+    paper that exceeds the token budget on its own falls back to the
+    per-paper path. Returns the output files that were written.
+    """
+    bins, oversized = _bin_papers(file_pairs, k, token_budget)
+    written = []
+
+    for group in bins:
+        if len(group) == 1:
+            input_file, output_file, _ = group[0]
+            if generate_transcript(input_file, output_file):
+                written.append(output_file)
+            continue
+
+        sections = []
+        group_outputs = {}
+        for idx, (input_file, output_file, content) in enumerate(group, 1):
+            group_outputs[f"P{idx}"] = output_file
+            sections.append(f"<<<PAPER P{idx}>>>\n{content}")
+
+        user_message = (
+            "Here are several academic papers, each preceded by a <<<PAPER Pn>>> marker. "
+            "Convert EACH paper into its own dialogue following the system guidelines. "
+            "Structure the output as a JSON object of the form "
+            '{"transcripts": [{"paper_id": "P1", "conversation": [...]}, ...]} '
+            "with one entry per paper, where each conversation entry has 'speaker' "
+            "(either 'Speaker 1' or 'Speaker 2') and 'dialogue' fields:\n\n"
+            + "\n\n".join(sections)
+        )
+
+        response = client.chat.completions.create(
+            model=MODEL,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": user_message}
+            ],
+            temperature=0.7,
+            # Each transcript runs ~2k tokens at the prompt-mandated
+            # length, so the budget scales with the group or every
+            # multi-paper call would truncate and fall back
+            max_tokens=2200 * len(group)
+        )
+
+        handled = set()
+        try:
+            data = json.loads(response.choices[0].message.content)
+            jsonschema.validate(data, BATCH_RESPONSE_FORMAT)
+            for entry in data['transcripts']:
+                output_file = group_outputs.get(entry.get('paper_id'))
+                if output_file and entry.get('conversation'):
+                    _write_transcript(output_file,
+                                      json.dumps({'conversation': entry['conversation']}))
+                    written.append(output_file)
+                    handled.add(output_file)
+        except (json.JSONDecodeError, jsonschema.ValidationError, KeyError, TypeError) as e:
+            print(f"Batched response unusable ({e}), retrying papers individually")
+
+        # Any paper the batched response missed gets its own call
+        for input_file, output_file, _ in group:
+            if output_file not in handled:
+                if generate_transcript(input_file, output_file):
+                    written.append(output_file)
+
+    for input_file, output_file in oversized:
+        if generate_transcript(input_file, output_file):
+            written.append(output_file)
+
+    return written
+
+def batch_generate_transcripts(file_pairs, poll_interval=30):
+    """
+    Route transcripts through the /v1/batches endpoint: roughly half the
+    price and free of synchronous RPM limits, at the cost of asynchronous
+    (up to 24h) turnaround. file_pairs is a list of (input, output) paths.
+    Returns the output files that were written.
+    """
+    outputs = {}
+    lines = []
+    for input_file, output_file in file_pairs:
+        paper_content = read_paper(input_file)
+        if not paper_content:
+            continue
+        # Pre-check the context budget client-side: a too-long request in
+        # a batch only reports its error after the (up to 24h) round-trip,
+        # so oversized papers go through the condenser before submission
+        # like the synchronous paths do
+        if len(paper_content) // 4 > MAX_DIRECT_TOKENS:
+            print(f"{input_file} exceeds the direct-token budget; condensing before batching")
+            paper_content = asyncio.run(_condense_paper(paper_content))
+        custom_id = os.path.basename(output_file)
+        outputs[custom_id] = (input_file, output_file)
+        lines.append(json.dumps({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": MODEL,
+                "response_format": {"type": "json_object"},
+                "messages": _build_messages(paper_content),
+                "temperature": 0.7,
+                "max_tokens": 4000,
+            },
+        }))
+    if not lines:
+        return []
+
+    with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+        f.write('\n'.join(lines))
+        requests_path = f.name
 
-def generate_transcript(input_file, output_file):
-    """Generate podcast transcript from academic paper using OpenAI."""
     try:
-        client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
-        if not os.getenv('OPENAI_API_KEY'):
-            raise ValueError("OPENAI_API_KEY environment variable not found")
-    except Exception as e:
-        print(f"Error initializing OpenAI client: {e}")
+        with open(requests_path, 'rb') as f:
+            batch_input = client.files.create(file=f, purpose='batch')
+    finally:
+        os.remove(requests_path)
+
+    batch = client.batches.create(
+        input_file_id=batch_input.id,
+        endpoint='/v1/chat/completions',
+        completion_window='24h'
+    )
+    print(f"Submitted batch {batch.id} with {len(lines)} papers")
+
+    while batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+
+    if batch.status != 'completed' or not batch.output_file_id:
+        print(f"Batch {batch.id} finished with status: {batch.status}")
+        return []
+
+    written = []
+    result_text = client.files.content(batch.output_file_id).text
+    for line in result_text.splitlines():
+        if not line:
+            continue
+        record = json.loads(line)
+        entry = outputs.get(record.get('custom_id'))
+        if not entry:
+            continue
+        input_file, output_file = entry
+        choices = record.get('response', {}).get('body', {}).get('choices') or []
+        content = choices[0]['message']['content'] if choices else None
+        if not content:
+            continue
+        # Same gate as the interactive paths: a malformed transcript that
+        # slipped through a 24h batch is the costliest place to let bad
+        # JSON reach the TTS stage
+        err = _validate_transcript(content)
+        if err:
+            print(f"Batch transcript for {output_file} failed schema validation: {err}")
+            repaired = _repair_transcript(content, err, MODEL)
+            if repaired and _validate_transcript(repaired) is None:
+                content = repaired
+            else:
+                # Repair failed too; regenerate this paper individually
+                if generate_transcript(input_file, output_file):
+                    written.append(output_file)
+                continue
+        _write_transcript(output_file, content)
+        written.append(output_file)
+    return written
+
+def generate_transcript(input_file, output_file, model=MODEL):
+    """Generate podcast transcript from academic paper using OpenAI."""
+    if not os.getenv('OPENAI_API_KEY'):
+        print("Error: OPENAI_API_KEY environment variable not found")
         return None
-    
+
     paper_content = read_paper(input_file)
-    print(f"Paper content length: {len(paper_content)} characters")
-    if len(paper_content) == 0:
+    if not paper_content:
         print("Warning: Paper content is empty!")
         return None
+    print(f"Paper content length: {len(paper_content)} characters")
     
+    # Check the cache against the raw text before condensing: condensed
+    # output is nondeterministic and would change the key every run
+    raw_content = paper_content
+    cached = _transcript_cache_get(raw_content, output_file, model)
+    if cached is not None:
+        print("Using cached transcript")
+        return cached
+
+    if len(paper_content) // 4 > MAX_DIRECT_TOKENS:
+        print("Paper is large; condensing sections before transcript generation...")
+        paper_content = asyncio.run(_condense_paper(paper_content))
+
     print("Sending request to OpenAI...")
-    
-    # Updated API call with structured output
+
+    # Stream the completion: the first tokens land on disk after ~1-2s
+    # instead of waiting out the whole 30-60s generation, and the full
+    # string is only assembled once for the return value
     response = client.chat.completions.create(
-        model="gpt-4-turbo-preview",
+        model=model,
         response_format={"type": "json_object"},
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": f"""Convert this academic paper into a dialogue following the system guidelines. 
-            Structure the output as a JSON object with a 'conversation' array where each entry has 'speaker' (either 'Speaker 1' or 'Speaker 2') 
-            and 'dialogue' fields:
-
-            Paper content:
-            {paper_content}"""}
-        ],
+        messages=_build_messages(paper_content),
         temperature=0.7,
-        max_tokens=4000
+        max_tokens=4000,
+        stream=True
     )
-    
-    # Get the generated text
-    generated_text = response.choices[0].message.content
-    print(f"Response received. Content length: {len(generated_text) if generated_text else 0}")
-    
+
+    pieces = []
+    with open(output_file, 'w', encoding='utf-8') as file:
+        for chunk in response:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                file.write(delta)
+                pieces.append(delta)
+
+    generated_text = ''.join(pieces)
+    print(f"Response received. Content length: {len(generated_text)}")
+
     if not generated_text:
         print("Warning: Received empty response from OpenAI")
         return None
-    
-    # Write the response directly to file
-    with open(output_file, 'w', encoding='utf-8') as file:
-        file.write(generated_text)
-    
+
+    err = _validate_transcript(generated_text)
+    if err:
+        print(f"Transcript failed schema validation: {err}")
+        repaired = _repair_transcript(generated_text, err, model)
+        if repaired and _validate_transcript(repaired) is None:
+            generated_text = repaired
+            err = None
+            _write_transcript(output_file, generated_text)
+
+    if (err or not _transcript_ok(generated_text)) and model != FALLBACK_MODEL:
+        print(f"Transcript from {model} failed validation; escalating to {FALLBACK_MODEL}")
+        return generate_transcript(input_file, output_file, model=FALLBACK_MODEL)
+
+    _transcript_cache_set(raw_content, generated_text, model)
     return generated_text
 
 if __name__ == "__main__":